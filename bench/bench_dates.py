@@ -0,0 +1,75 @@
+"""Micro-benchmark: per-call cost of date normalization, dateparser only (before) vs dates.py (after).
+
+    python bench/bench_dates.py [--calls 20000]
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# Typical mix seen by the crawler: mostly ISO (trafilatura, sitemaps, <time>), some RSS, a few free-form
+ISO = [f"2024-{m:02d}-{d:02d}" for m in range(1, 13) for d in range(1, 29)]
+ISO_TS = [f"{x}T{h:02d}:00:00+00:00" for x in ISO[::7] for h in (8, 17)]
+RFC = [f"Tue, {d:02d} Mar 2024 10:00:00 GMT" for d in range(1, 29)]
+FREE = ["March 5, 2024", "5 mars 2024", "Jan 3rd, 2023", "2 days ago", "Published: 12/04/2023"]
+
+
+def corpus(calls, seed=0):
+    rng = random.Random(seed)
+    pools = [(ISO, 0.6), (ISO_TS, 0.2), (RFC, 0.15), (FREE, 0.05)]
+    return [rng.choice(rng.choices([p for p, _ in pools], [w for _, w in pools])[0]) for _ in range(calls)]
+
+
+def warm_dateparser():
+    """Imports dateparser and parses each free-form sample once; returns the seconds spent.
+
+    Its first parse of a new format loads language data (~3 s for "Published: ..."),
+    a one-off that would otherwise dominate the per-call figures.
+    """
+    import dates
+    start = time.perf_counter()
+    for value in FREE:
+        dates._dateparser(value)
+    return time.perf_counter() - start
+
+
+def timed(label, fn, values):
+    start = time.perf_counter()
+    for value in values:
+        fn(value)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<34} {elapsed * 1e6 / len(values):9.2f} µs/call  ({elapsed:.2f}s for {len(values)})")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=20000)
+    args = parser.parse_args()
+    values = corpus(args.calls)
+
+    start = time.perf_counter()
+    from dateparser import parse
+    print(f"{'import dateparser':<34} {(time.perf_counter() - start) * 1000:9.0f} ms (paid at startup before, lazily now)")
+    print(f"{'dateparser first parses':<34} {warm_dateparser() * 1000:9.0f} ms (once per process, not in the figures below)")
+
+    def before(raw):
+        parsed = parse(str(raw))
+        return parsed.strftime("%Y-%m-%d") if parsed else None
+
+    import dates
+    mismatches = sum(1 for v in set(values) if before(v) != dates.normalize_date(v) and "ago" not in v)
+    dates._normalize.cache_clear()
+
+    slow = timed("before: dateparser.parse", before, values)
+    dates._normalize.cache_clear()
+    cold = timed("after: fast paths, cold cache", lambda v: dates._normalize.__wrapped__(str(v).strip()), values)
+    fast = timed("after: fast paths + LRU cache", dates.normalize_date, values)
+    print(f"speed-up: x{slow / cold:.0f} without cache, x{slow / fast:.0f} with cache; {mismatches} result mismatches")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""Local farm of synthetic AI blogs for offline crawler benchmarks.
+
+Each site runs on its own 127.0.0.1 port (so it is its own "domain" for the
+politeness scheduler) and is one of:
+    feed      listing + RSS feed advertised with <link rel="alternate">
+    paginated listing split over /blog/page/N, no feed (scroll fallback)
+    infinite  listing that loads more posts on scroll through fetch() (needs the browser)
+    slow      like "feed", with SLOW_DELAY added to every response
+    jsonly    like "feed", but post bodies are rendered by JavaScript (HTTP -> browser escalation)
+Every site also carries noise: tag/author/pagination links, a year archive,
+a "Latest News" index post, share links, and posts older than MIN_YEAR.
+
+    python bench/blogfarm.py --sites 5 --posts 60     # serve until Ctrl+C, prints the urls.txt lines
+"""
+import argparse
+import random
+import threading
+import time
+from email.utils import format_datetime
+from datetime import datetime, timezone
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+from synthetic import paragraphs, post_dates, post_html
+
+KINDS = ["feed", "paginated", "infinite", "slow", "jsonly"]
+PAGE_SIZE = 20
+SLOW_DELAY = 0.25
+
+
+class Site:
+    def __init__(self, index, kind, posts, old_ratio, seed):
+        rng = random.Random(seed * 1000 + index)
+        self.kind = kind
+        self.name = f"{kind}{index}"
+        dates = post_dates(rng, posts, old_ratio)
+        self.posts = []
+        for i, published in enumerate(dates):
+            title = f"{self.name.title()} post {i}: {rng.choice(['scaling', 'agents', 'robots', 'serving', 'retrieval'])} update"
+            slug = f"post-{i}"
+            self.posts.append({"slug": slug, "title": title, "date": published.isoformat(), "seed": rng.random()})
+        # Index-like page that slipped into the listing (caught by the title safety net)
+        self.posts.insert(len(self.posts) // 3, {"slug": "latest-news", "title": "Latest News", "date": dates[0].isoformat(), "seed": 0.5})
+        self.by_slug = {p["slug"]: p for p in self.posts}
+
+    def card(self, post):
+        return (
+            f"<article class='card'><a href='/blog/{post['slug']}'>{post['title']}</a>"
+            f"<time datetime='{post['date']}'>{post['date']}</time></article>"
+        )
+
+    def listing(self, page=1):
+        feed = "<link rel='alternate' type='application/rss+xml' href='/blog/feed.xml'>" if self.kind in ("feed", "slow", "jsonly") else ""
+        posts = self.posts if self.kind in ("feed", "slow", "jsonly") else self.posts[(page - 1) * PAGE_SIZE: page * PAGE_SIZE]
+        noise = (
+            "<a href='/blog/tag/agents'>#agents</a> <a href='/blog/author/jane'>Jane</a> "
+            "<a href='/blog/2021/'>2021 archive</a> <a href='https://twitter.com/share?u=x'>Share</a> "
+            "<a href='/blog/category/research'>Research</a>"
+        )
+        more = ""
+        if self.kind == "paginated" and page * PAGE_SIZE < len(self.posts):
+            more = f"<a href='/blog/page/{page + 1}'>Older posts</a>"
+        if self.kind == "infinite":
+            more = (
+                "<div id='sentinel'></div><script>"
+                f"let offset = {PAGE_SIZE}, busy = false;"
+                "window.addEventListener('scroll', async () => {"
+                " if (busy || offset < 0) return; busy = true;"
+                " const html = await (await fetch('/blog/more?offset=' + offset)).text();"
+                " if (!html) { offset = -1; return; }"
+                f" document.getElementById('list').insertAdjacentHTML('beforeend', html); offset += {PAGE_SIZE}; busy = false;"
+                "});</script>"
+            )
+        cards = "".join(self.card(p) for p in posts)
+        return f"<!doctype html><html><head><title>{self.name} blog</title>{feed}</head><body>{noise}<main id='list'>{cards}</main>{more}</body></html>"
+
+    def more(self, offset):
+        return "".join(self.card(p) for p in self.posts[offset: offset + PAGE_SIZE])
+
+    def feed(self, base):
+        items = "".join(
+            f"<item><title>{p['title']}</title><link>{base}/blog/{p['slug']}</link>"
+            f"<pubDate>{format_datetime(datetime.fromisoformat(p['date']).replace(hour=9, tzinfo=timezone.utc))}</pubDate></item>"
+            for p in self.posts
+        )
+        return f"<?xml version='1.0'?><rss version='2.0'><channel><title>{self.name}</title>{items}</channel></rss>"
+
+    def post(self, slug):
+        post = self.by_slug.get(slug)
+        if not post:
+            return None
+        rng = random.Random(post["seed"])
+        body = paragraphs(rng, 2, 30) if slug == "latest-news" else paragraphs(rng)
+        related = " ".join(f"<a href='/blog/{p['slug']}'>{p['title']}</a>" for p in rng.sample(self.posts, 3))
+        return post_html(post["title"], post["date"], body, js_only=self.kind == "jsonly", extra_links=related)
+
+
+def make_handler(site):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _send(self, status, body="", content_type="text/html; charset=utf-8"):
+            data = body.encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if site.kind == "slow":
+                time.sleep(SLOW_DELAY)
+            url = urlparse(self.path)
+            path = url.path.rstrip("/")
+            base = f"http://{self.headers.get('Host')}"
+            if path == "/blog":
+                return self._send(200, site.listing())
+            if path.startswith("/blog/page/"):
+                return self._send(200, site.listing(int(path.rsplit("/", 1)[1])))
+            if path == "/blog/more" and site.kind == "infinite":
+                return self._send(200, site.more(int(parse_qs(url.query).get("offset", ["0"])[0])))
+            if path == "/blog/feed.xml" and site.kind in ("feed", "slow", "jsonly"):
+                return self._send(200, site.feed(base), "application/rss+xml")
+            if path.startswith("/blog/"):
+                html = site.post(path.rsplit("/", 1)[1])
+                if html: return self._send(200, html)
+            return self._send(404, "<html><body>Not found</body></html>")
+
+    return Handler
+
+
+class BlogFarm:
+    """Starts one threaded HTTP server per synthetic site (ephemeral ports)."""
+
+    def __init__(self, sites=5, posts=60, old_ratio=0.2, kinds=None, seed=0):
+        kinds = kinds or KINDS
+        self.sites = [Site(i, kinds[i % len(kinds)], posts, old_ratio, seed) for i in range(sites)]
+        self.servers = []
+
+    def start(self):
+        for site in self.sites:
+            server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(site))
+            server.daemon_threads = True
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            self.servers.append(server)
+        return self.urls()
+
+    def urls(self):
+        return [f"http://127.0.0.1:{server.server_address[1]}/blog/" for server in self.servers]
+
+    def expected_articles(self, min_year):
+        """Fresh, non-noise posts: what a perfect crawl would save."""
+        return sum(1 for site in self.sites for p in site.posts if p["slug"] != "latest-news" and int(p["date"][:4]) >= min_year)
+
+    def stop(self):
+        for server in self.servers:
+            server.shutdown()
+            server.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve a synthetic blog farm on localhost.")
+    parser.add_argument("--sites", type=int, default=5)
+    parser.add_argument("--posts", type=int, default=60)
+    parser.add_argument("--old-ratio", type=float, default=0.2)
+    args = parser.parse_args()
+    farm = BlogFarm(args.sites, args.posts, args.old_ratio)
+    for url in farm.start():
+        print(url)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        farm.stop()
@@ -0,0 +1,252 @@
+"""Offline benchmark suite: no live site, results stored in bench/results/ for comparison.
+
+    python bench/run.py                        # every benchmark
+    python bench/run.py classify scan          # a subset
+    python bench/run.py --quick                # smaller inputs (CI smoke run)
+    python bench/run.py --compare              # only print the last two stored runs side by side
+
+Benchmarks:
+    classify    classify_content docs/sec (one process) and classify_many (all cores)
+    extraction  extract_page pages/sec (one process, then a process pool)
+    dates       normalize_date calls/sec on a crawler-like mix
+    scan        scan_existing_files, clean_noise (rules, then + duplicates) and UrlIndex.reconcile (cold, warm) on a synthetic tree
+    crawl       ingest_auto_crawl end to end against the local blog farm (needs Playwright's Chromium)
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+REPO_DIR = BENCH_DIR.parent
+sys.path.insert(0, str(REPO_DIR))
+sys.path.insert(0, str(BENCH_DIR))
+
+from config import MIN_YEAR
+from synthetic import text, paragraphs, post_html, generate_tree, tree_size
+
+RESULTS_DIR = BENCH_DIR / "results"
+DATA_DIR = BENCH_DIR / ".data"
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+
+# --- BENCHMARKS ---
+def bench_classify(quick):
+    from classifier import classify_many
+    from utils import classify_content
+    rng = random.Random(1)
+    docs = [text(rng, rng.randint(400, 1500)) for _ in range(500 if quick else 5000)]
+    megabytes = sum(len(d) for d in docs) / 1e6
+    elapsed, _ = timed(lambda: [classify_content(d) for d in docs])
+    parallel, _ = timed(classify_many, docs)
+    return {
+        "docs": len(docs),
+        "docs_per_s": round(len(docs) / elapsed, 1),
+        "mb_per_s": round(megabytes / elapsed, 2),
+        "parallel_docs_per_s": round(len(docs) / parallel, 1),
+    }
+
+
+def bench_extraction(quick):
+    from pipeline import extract_page
+    rng = random.Random(2)
+    pages = [
+        (f"https://synthetic.example/blog/post-{i}",
+         post_html(f"Post {i} about agents", f"2025-0{1 + i % 9}-1{i % 10}", paragraphs(rng)))
+        for i in range(40 if quick else 300)
+    ]
+    elapsed, results = timed(lambda: [extract_page(url, html) for url, html in pages])
+    saved = sum(1 for r in results if r["status"] == "ok")
+    workers = os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(extract_page, *zip(*pages[:workers])))  # Warm the workers up (imports)
+        parallel, _ = timed(lambda: list(executor.map(extract_page, *zip(*pages), chunksize=4)))
+    return {
+        "pages": len(pages),
+        "extracted_ok": saved,
+        "pages_per_s": round(len(pages) / elapsed, 1),
+        "ms_per_page": round(elapsed * 1000 / len(pages), 2),
+        "parallel_pages_per_s": round(len(pages) / parallel, 1),
+        "workers": workers,
+    }
+
+
+def bench_dates(quick):
+    import dates
+    from bench_dates import corpus, warm_dateparser
+    values = corpus(2000 if quick else 20000)
+    # Lazy import and dateparser's first-parse setup (seconds) reported apart: the rate tracks the steady state
+    warmup = warm_dateparser()
+    dates._normalize.cache_clear()
+    elapsed, _ = timed(lambda: [dates.normalize_date(v) for v in values])
+    return {"calls": len(values), "calls_per_s": round(len(values) / elapsed), "us_per_call": round(elapsed * 1e6 / len(values), 2),
+            "dateparser_warmup_s": round(warmup, 2)}
+
+
+def bench_scan(quick, files=50000):
+    from utils import scan_existing_files
+    from clean_noise import find_noise
+    from url_index import UrlIndex
+    files = 2000 if quick else files
+    root = DATA_DIR / f"tree_{files}"
+    generated, _ = timed(generate_tree, root, files)
+    results = {"files": tree_size(root), "generate_s": round(generated, 2)}
+
+    elapsed, urls = timed(scan_existing_files, root)
+    results.update(scan_existing_files_s=round(elapsed, 3), scan_files_per_s=round(results["files"] / elapsed))
+    elapsed, (noisy, _) = timed(find_noise, root, ["name", "url", "short", "boilerplate"])
+    results.update(clean_noise_scan_s=round(elapsed, 3), noise_found=len(noisy))
+    elapsed, (noisy, _) = timed(find_noise, root)  # + SimHash of every clean file (no index to reuse)
+    results.update(clean_noise_dedup_s=round(elapsed, 3), noise_with_duplicates=len(noisy))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        index = UrlIndex(Path(tmp) / "index.db")
+        elapsed, _ = timed(index.reconcile, root)
+        results["reconcile_cold_s"] = round(elapsed, 3)
+        elapsed, _ = timed(index.reconcile, root)
+        results["reconcile_warm_s"] = round(elapsed, 3)
+        index.close()
+    return results
+
+
+def bench_crawl(quick, sites=5, posts=60):
+    from blogfarm import BlogFarm
+    farm = BlogFarm(sites, 20 if quick else posts)
+    urls = farm.start()
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp = Path(tmp)
+            (tmp / "urls.txt").write_text("\n".join(urls) + "\n", encoding="utf-8")
+            env = dict(
+                os.environ,
+                NOTEBOOKLM_BASE_DIR=str(tmp),  # urls.txt, index, cache, reports, work queue... all in the temp dir
+                NOTEBOOKLM_OUTPUT_DIR=str(tmp / "corpus"),
+                NOTEBOOKLM_DOMAIN_DELAY="(0, 0)",
+                NOTEBOOKLM_MAX_PAGES_PER_SITE="1000000",
+                NOTEBOOKLM_SOURCE_FEEDS="{}",
+            )
+            start = time.perf_counter()
+            proc = subprocess.run(
+                [sys.executable, str(REPO_DIR / "ingest_auto_crawl.py")],
+                cwd=tmp, env=env, capture_output=True, text=True, timeout=1800
+            )
+            elapsed = time.perf_counter() - start
+            saved = tree_size(tmp / "corpus") if (tmp / "corpus").exists() else 0
+            results = {
+                "sites": sites, "expected_articles": farm.expected_articles(MIN_YEAR),
+                "saved": saved, "wall_s": round(elapsed, 2), "pages_per_s": round(saved / elapsed, 2),
+            }
+            reports = sorted((tmp / "reports").glob("crawl_*.json"))
+            if reports:
+                report = json.loads(reports[-1].read_text(encoding="utf-8"))
+                results["stage_seconds"] = {stage: h["sum"] for stage, h in report["stages"].items()}
+                results["counters"] = report["counters"]
+            if proc.returncode != 0 or not saved:
+                lines = (proc.stderr or proc.stdout).strip().splitlines()
+                errors = [line for line in lines if "Error" in line or "error" in line]
+                results["error"] = (errors or lines or ["no article saved"])[-1].strip()
+            return results
+    finally:
+        farm.stop()
+
+
+BENCHMARKS = {
+    "classify": bench_classify,
+    "extraction": bench_extraction,
+    "dates": bench_dates,
+    "scan": bench_scan,
+    "crawl": bench_crawl,
+}
+
+
+# --- RESULTS ---
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR, capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return "unknown"
+
+
+def flatten(results, prefix=""):
+    for key, value in results.items():
+        if isinstance(value, dict):
+            yield from flatten(value, f"{prefix}{key}.")
+        elif isinstance(value, (int, float)):
+            yield f"{prefix}{key}", value
+
+
+def compare(previous, current):
+    """Prints every numeric result next to the previous stored run."""
+    old = dict(flatten(previous["results"]))
+    print(f"\n{'metric':<48} {previous['git']:>12} {current['git']:>12}   change")
+    for key, value in flatten(current["results"]):
+        before = old.get(key)
+        change = f"{(value - before) / before * 100:+.1f}%" if before else ""
+        print(f"{key:<48} {before if before is not None else '-':>12} {value:>12}   {change}")
+
+
+def stored_runs():
+    return sorted(RESULTS_DIR.glob("*.json"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark suite (results in bench/results/).")
+    parser.add_argument("benchmarks", nargs="*", help=f"Any of {', '.join(BENCHMARKS)} (default: all)")
+    parser.add_argument("--quick", action="store_true", help="Small inputs (smoke run)")
+    parser.add_argument("--files", type=int, default=50000, help="Synthetic tree size for the scan benchmark")
+    parser.add_argument("--compare", action="store_true", help="Compare the last two stored runs and exit")
+    args = parser.parse_args()
+
+    if args.compare:
+        runs = stored_runs()
+        if len(runs) < 2:
+            print("Need at least two stored runs in bench/results/")
+            return
+        compare(*(json.loads(p.read_text(encoding="utf-8")) for p in runs[-2:]))
+        return
+
+    unknown = set(args.benchmarks) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"unknown benchmark(s): {', '.join(sorted(unknown))}")
+
+    run = {
+        "git": git_revision(), "date": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count(),
+        "quick": args.quick, "results": {},
+    }
+    for name in args.benchmarks or list(BENCHMARKS):
+        print(f"▶ {name}...", flush=True)
+        try:
+            if name == "scan":
+                results = bench_scan(args.quick, args.files)
+            else:
+                results = BENCHMARKS[name](args.quick)
+        except Exception as e:
+            results = {"error": f"{type(e).__name__}: {e}"}
+        run["results"][name] = results
+        print(json.dumps(results, indent=2), flush=True)
+
+    previous = stored_runs()
+    RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+    path = RESULTS_DIR / f"{datetime.now():%Y%m%d_%H%M%S}_{run['git']}{'_quick' if args.quick else ''}.json"
+    path.write_text(json.dumps(run, indent=2), encoding="utf-8")
+    print(f"\nStored in {path}")
+    if previous:
+        compare(json.loads(previous[-1].read_text(encoding="utf-8")), run)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""Deterministic synthetic content: article texts, blog post HTML and a saved-corpus tree."""
+import os
+import random
+import shutil
+import sys
+from datetime import date, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from config import CATEGORIES, MIN_YEAR
+from utils import format_article, slugify
+
+FILLER = (
+    "the of and to in is that for on with as this we by are from be it at an which our can model models data "
+    "results training performance new approach using used work also these more than system systems research "
+    "show paper method methods learning time different two each first large based task tasks how use"
+).split()
+TOPIC_WORDS = [kw for subs in CATEGORIES.values() for kws in subs.values() for kw in kws]
+
+
+def text(rng, words=600, topics=None):
+    """Filler prose sprinkled with category keywords (about 1 word in 25)."""
+    topics = topics or rng.sample(TOPIC_WORDS, 4)
+    out = []
+    for i in range(words):
+        out.append(rng.choice(topics) if rng.random() < 0.04 else rng.choice(FILLER))
+        if i % 18 == 17: out[-1] += "."
+    return " ".join(out).capitalize() + "."
+
+
+def paragraphs(rng, count=8, words=80):
+    topics = rng.sample(TOPIC_WORDS, 4)
+    return [text(rng, words, topics) for _ in range(count)]
+
+
+def post_dates(rng, count, old_ratio=0.2, today=None):
+    """Newest first; the last `old_ratio` of the posts predate MIN_YEAR."""
+    today = today or date(2026, 6, 1)
+    fresh = int(count * (1 - old_ratio))
+    fresh_span = (today - date(MIN_YEAR + 1, 1, 1)).days
+    old_span = (date(MIN_YEAR - 1, 12, 31) - date(MIN_YEAR - 4, 1, 1)).days
+    dates = sorted((today - timedelta(days=rng.randrange(fresh_span)) for _ in range(fresh)), reverse=True)
+    dates += sorted((date(MIN_YEAR - 4, 1, 1) + timedelta(days=rng.randrange(old_span)) for _ in range(count - fresh)), reverse=True)
+    return dates
+
+
+def post_html(title, published, body_paragraphs, js_only=False, extra_links=""):
+    """A blog post page; js_only posts ship an empty shell filled in by a script (HTTP extraction fails)."""
+    body = "".join(f"<p>{p}</p>" for p in body_paragraphs)
+    if js_only:
+        payload = body.replace("\\", "\\\\").replace("`", "\\`")
+        article = f"<article id='post'></article><script>document.getElementById('post').innerHTML = `{payload}`;</script>"
+    else:
+        article = f"<article><h1>{title}</h1><time datetime='{published}'>{published}</time>{body}</article>"
+    return (
+        "<!doctype html><html><head>"
+        f"<title>{title}</title>"
+        f"<meta property='article:published_time' content='{published}T09:00:00Z'>"
+        f"<meta name='description' content='{title}'>"
+        "</head><body>"
+        "<nav><a href='/'>Home</a> <a href='/about'>About</a> <a href='/careers'>Careers</a></nav>"
+        f"{article}"
+        f"<aside>{extra_links}</aside>"
+        "<footer>© Synthetic Labs. <a href='https://twitter.com/intent/tweet?url=x'>Share</a></footer>"
+        "</body></html>"
+    )
+
+
+def generate_tree(root, files=50000, noise_ratio=0.02, duplicate_ratio=0.05, seed=0):
+    """Writes a saved-corpus lookalike (Category/Subcategory/Year/*.md with SOURCE INFO headers).
+
+    Every body is distinct except `duplicate_ratio` of the files, which copy an
+    earlier one. Reused as is when root already holds a complete tree of the
+    same size and duplicate rate; any other content of root is wiped first.
+    """
+    root = Path(root)
+    marker = root / f".complete_{files}_{duplicate_ratio}"
+    if marker.exists():
+        return root
+    shutil.rmtree(root, ignore_errors=True)  # Partial tree, or one generated with other settings
+    rng = random.Random(seed)
+    leaves = [(cat, sub) for cat, subs in CATEGORIES.items() for sub in subs]
+    sites = [f"site{i}" for i in range(12)]
+    # ~1.5 KB bodies stitched from 5 of 2000 passages: distinct fingerprints, generation stays fast
+    passages = [text(rng, 50) for _ in range(2000)]
+    bodies = []
+    made_dirs = set()
+    for i in range(files):
+        category, subcategory = rng.choice(leaves)
+        year = rng.randint(MIN_YEAR, 2026)
+        published = f"{year}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+        site = rng.choice(sites)
+        noisy = rng.random() < noise_ratio
+        if noisy:
+            slug, url = rng.choice([
+                ("latest_news", f"https://{site}.example/blog/latest-news-{i}"),
+                (f"tag_agents_{i}", f"https://{site}.example/blog/tag/agents-{i}"),
+                (f"post_{i}", f"https://{site}.example/blog/page/{i}"),
+            ])
+        else:
+            slug = slugify(f"post {i} {rng.choice(TOPIC_WORDS)}")
+            url = f"https://{site}.example/blog/{slug}"
+        folder = root / category / subcategory / str(year)
+        if folder not in made_dirs:
+            folder.mkdir(parents=True, exist_ok=True)
+            made_dirs.add(folder)
+        if bodies and rng.random() < duplicate_ratio:
+            body = rng.choice(bodies)
+        else:
+            body = " ".join(rng.sample(passages, 5))
+            bodies.append(body)
+        (folder / f"{published}_{site}_{slug}.md").write_text(
+            format_article(url, published, category, subcategory, body), encoding="utf-8"
+        )
+    marker.touch()
+    return root
+
+
+def tree_size(root):
+    return sum(len([f for f in names if f.endswith(".md")]) for _, _, names in os.walk(root))
@@ -0,0 +1,153 @@
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from config import CATEGORIES, CLASSIFY_WORD_BOUNDARY
+
+try:
+    import ahocorasick  # Optional C implementation (pip install pyahocorasick)
+except ImportError:
+    ahocorasick = None
+
+
+class KeywordClassifier:
+    """Aho-Corasick automaton over every keyword of CATEGORIES: one pass scores all subcategories.
+
+    With word_boundary=False the scores are identical to summing `text.count(k)`
+    per keyword (matches of a given keyword never overlap, as with str.count).
+    With word_boundary=True a match only counts when it is not glued to a
+    letter/digit ("rag" no longer matches inside "storage").
+    """
+
+    def __init__(self, categories=CATEGORIES, word_boundary=False):
+        self.word_boundary = word_boundary
+        self.labels = []    # (category, subcategory) in CATEGORIES order (tie-break order)
+        self.keywords = []  # keyword id -> (keyword, [label ids])
+        ids = {}
+        for cat, subcats in categories.items():
+            for subcat, words in subcats.items():
+                label_id = len(self.labels)
+                self.labels.append((cat, subcat))
+                for word in words:
+                    word = word.lower()
+                    if word not in ids:
+                        ids[word] = len(self.keywords)
+                        self.keywords.append((word, []))
+                    self.keywords[ids[word]][1].append(label_id)
+        self._build(ids)
+
+    def _build(self, ids):
+        if ahocorasick:
+            self._native = ahocorasick.Automaton()
+            for word, kid in ids.items():
+                self._native.add_word(word, (kid, len(word)))
+            self._native.make_automaton()
+            return
+        self._native = None
+
+        # Trie
+        goto = [{}]
+        out = [[]]
+        for word, kid in ids.items():
+            state = 0
+            for ch in word:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][ch] = nxt
+                    goto.append({})
+                    out.append([])
+                state = nxt
+            out[state].append((kid, len(word)))
+
+        # Failure links (BFS), then flatten into a full transition table over the keyword alphabet:
+        # characters outside the alphabet always go back to the root.
+        alphabet = {ch for word in ids for ch in word}
+        fail = [0] * len(goto)
+        delta = [None] * len(goto)
+        delta[0] = {ch: goto[0].get(ch, 0) for ch in alphabet}
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            parent_fail = fail[state]  # Shallower state: its row and outputs are already final
+            out[state] = out[state] + out[parent_fail]
+            row = dict(delta[parent_fail])
+            for ch, nxt in goto[state].items():
+                row[ch] = nxt
+                fail[nxt] = delta[parent_fail].get(ch, 0)
+                queue.append(nxt)
+            delta[state] = row
+        self._delta = delta
+        self._out = [tuple(o) for o in out]
+
+    def _matches(self, text):
+        """Yields (end_index, keyword_id, length) for every (possibly overlapping) occurrence."""
+        if self._native:
+            for end, (kid, length) in self._native.iter(text):
+                yield end, kid, length
+            return
+        delta, out = self._delta, self._out
+        state = 0
+        for end, ch in enumerate(text):
+            state = delta[state].get(ch, 0)
+            if out[state]:
+                for kid, length in out[state]:
+                    yield end, kid, length
+
+    def keyword_counts(self, text):
+        text = text.lower()
+        counts = [0] * len(self.keywords)
+        next_free = [0] * len(self.keywords)  # Non-overlapping per keyword, like str.count
+        boundary = self.word_boundary
+        size = len(text)
+        for end, kid, length in self._matches(text):
+            start = end - length + 1
+            if start < next_free[kid]:
+                continue
+            if boundary and ((start > 0 and text[start - 1].isalnum()) or
+                             (end + 1 < size and text[end + 1].isalnum())):
+                continue
+            counts[kid] += 1
+            next_free[kid] = end + 1
+        return counts
+
+    def scores(self, text):
+        """{(category, subcategory): hits} for every subcategory with at least one hit."""
+        totals = [0] * len(self.labels)
+        for kid, count in enumerate(self.keyword_counts(text)):
+            if count:
+                for label_id in self.keywords[kid][1]:
+                    totals[label_id] += count
+        return {self.labels[i]: total for i, total in enumerate(totals) if total > 0}
+
+    def classify(self, text):
+        scores = self.scores(text)
+        if not scores: return "Uncategorized", "Misc"
+        return max(scores, key=scores.get)
+
+
+_classifiers = {}
+
+def get_classifier(word_boundary=CLASSIFY_WORD_BOUNDARY):
+    """Compiled once per process and per boundary mode."""
+    if word_boundary not in _classifiers:
+        _classifiers[word_boundary] = KeywordClassifier(CATEGORIES, word_boundary)
+    return _classifiers[word_boundary]
+
+
+def _classify_chunk(texts, word_boundary):
+    classifier = get_classifier(word_boundary)
+    return [classifier.classify(t) for t in texts]
+
+
+def classify_many(texts, word_boundary=CLASSIFY_WORD_BOUNDARY, workers=None, chunk_size=256):
+    """Classifies a batch of documents, spread over a process pool when the batch is large."""
+    texts = list(texts)
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(texts) <= chunk_size:
+        return _classify_chunk(texts, word_boundary)
+
+    chunks = [texts[i:i + chunk_size] for i in range(0, len(texts), chunk_size)]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = executor.map(_classify_chunk, chunks, [word_boundary] * len(chunks))
+        return [label for chunk in results for label in chunk]
@@ -1,49 +1,256 @@
+import argparse
+import json
 import os
-from config import OUTPUT_DIR, NOISE_KEYWORDS
-from utils import setup_logging
+import re
+import shutil
+import sys
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+from config import (
+    OUTPUT_DIR, QUARANTINE_DIR, NOISE_KEYWORDS, NOISE_URL_PATTERNS, BOILERPLATE_PATTERNS,
+    CLEAN_NOISE_THREADS, NOISE_MIN_BODY_LENGTH, NOISE_BOILERPLATE_RATIO, SIMHASH_MAX_DISTANCE
+)
+from utils import setup_logging, parse_article
+from dedup import fingerprint_file, remember, bands, hamming, to_unsigned
+from url_index import UrlIndex
 
 # --- LOGGING ---
 logger = setup_logging("clean_noise")
 
-def is_noise(file_path):
-    """Détermine si un fichier est du bruit basé sur son nom ou son contenu."""
-    filename = file_path.name.lower()
-    
-    # 1. Check filename patterns
-    if any(k in filename for k in NOISE_KEYWORDS):
-        return True, f"Nom suspect ({next(k for k in NOISE_KEYWORDS if k in filename)})"
+RULES = ["name", "url", "short", "boilerplate", "duplicate"]
+INTERACTIVE_RULES = ["name", "url"]  # Interactive mode: content rules only run when asked for with --rules
+
+# --- RÈGLES (compilées une fois) ---
+NAME_RE = re.compile("|".join(re.escape(k) for k in NOISE_KEYWORDS))
+URL_RE = re.compile("|".join(re.escape(k) for k in NOISE_URL_PATTERNS))
+BOILERPLATE_RE = re.compile("|".join(re.escape(k) for k in BOILERPLATE_PATTERNS), re.IGNORECASE)
+STRUCTURE_RE = re.compile(r"[|#>]|[-*+] |\d+[.)] ")  # Table row, heading, quote, list item
+
+
+def boilerplate_ratio(body):
+    """Share of the body (chars) in lines that are page chrome (short lines with a boilerplate phrase).
+
+    Code blocks, table rows, list items and headings are content whatever
+    their words: they count in the total, never as chrome.
+    """
+    total = chrome = 0
+    in_code = False
+    for line in body.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        total += len(line)
+        if line.startswith(("```", "~~~")):
+            in_code = not in_code
+            continue
+        if in_code or STRUCTURE_RE.match(line):
+            continue
+        if len(line) < 200 and BOILERPLATE_RE.search(line):
+            chrome += len(line)
+    return chrome / total if total else 1.0
 
-    # 2. Check content (URL headers)
+
+def check_file(path, rules, url=None):
+    """Thread pool worker: applies the per-file rules to one article.
+
+    Returns {path, url, size, mtime, rule, reason, simhash}; `rule` is None for
+    a clean file. SimHashes are filled in afterwards (CPU-bound: process pool).
+    """
+    path = str(path)
+    result = {"path": path, "url": url, "rule": None, "reason": None, "simhash": None}
+    match = NAME_RE.search(os.path.basename(path).lower()) if "name" in rules else None
+    if match:
+        return dict(result, rule="name", reason=f"Nom suspect ({match.group()})")
     try:
-        with open(file_path, "r", encoding="utf-8", errors="ignore") as f:
-            for _ in range(10):
-                line = f.readline()
-                if line.startswith("URL:"):
-                    url = line.split("URL:", 1)[1].strip().lower()
-                    if any(k in url for k in ["/label/", "/tag/", "/category/", "/page/", "share="]):
-                        return True, "URL d'index/pagination"
-                    break
-    except:
-        pass
-
-    return False, None
+        stat = os.stat(path)
+        result.update(size=stat.st_size, mtime=stat.st_mtime)
+        with open(path, "r", encoding="utf-8", errors="ignore") as f:
+            header, body = parse_article(f.read())
+    except OSError as e:
+        return dict(result, rule="unreadable", reason=str(e))
+    result["url"] = url = header.get("URL") or url
+    body = body.strip()
+
+    if "url" in rules and url and URL_RE.search(url.lower()):
+        return dict(result, rule="url", reason="URL d'index/pagination")
+    if "short" in rules and len(body) < NOISE_MIN_BODY_LENGTH:
+        return dict(result, rule="short", reason=f"Contenu trop court ({len(body)} car.)")
+    if "boilerplate" in rules:
+        ratio = boilerplate_ratio(body)
+        if ratio > NOISE_BOILERPLATE_RATIO:
+            return dict(result, rule="boilerplate", reason=f"Boilerplate dominant ({ratio:.0%})")
+    return result
+
+
+def flag_duplicates(results, max_distance=SIMHASH_MAX_DISTANCE):
+    """Flags near-duplicates among the clean files, keeping the longest copy of each group (LSH buckets, no pairwise scan)."""
+    kept, buckets = [], {}
+    candidates = sorted((r for r in results if r["rule"] is None and r["simhash"] is not None),
+                        key=lambda r: (-r.get("size", 0), r["path"]))
+    for result in candidates:
+        value = result["simhash"]
+        keys = [(band, v) for band, v in enumerate(bands(value))]
+        original = next((kept[i] for key in keys for i in buckets.get(key, ())
+                         if hamming(value, kept[i]["simhash"]) <= max_distance), None)
+        if original:
+            result.update(rule="duplicate", reason=f"Quasi-doublon de {os.path.basename(original['path'])}", duplicate_of=original["path"])
+            continue
+        for key in keys:
+            buckets.setdefault(key, []).append(len(kept))
+        kept.append(result)
+
+
+def list_files(output_dir, index=None):
+    """(path, url) of every article: from the index (no directory walk) or by walking output_dir."""
+    if index is not None:
+        index.reconcile(output_dir)
+        return index.document_paths()
+    files, stack = [], [str(output_dir)]
+    while stack:
+        with os.scandir(stack.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir():
+                    stack.append(entry.path)
+                elif entry.name.endswith(".md"):
+                    files.append((entry.path, None))
+    return files
+
+
+def find_noise(output_dir, rules=RULES, threads=CLEAN_NOISE_THREADS, index=None, workers=None):
+    """Returns ([noise item], scanned file count); each item is a check_file result with a rule.
+
+    Files are read on a thread pool (I/O-bound). With an index, the file list
+    comes from the index and the SimHashes already stored by the crawler are
+    reused; the missing ones are computed on a process pool and stored.
+    """
+    files = list_files(output_dir, index)
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        results = list(executor.map(check_file, [p for p, _ in files], [set(rules)] * len(files), [u for _, u in files]))
+
+    if "duplicate" in rules:
+        known = index.fingerprint_map() if index is not None else {}
+        missing = []
+        for result in results:
+            if result["rule"] is None:
+                if result["url"] in known:
+                    result["simhash"] = to_unsigned(known[result["url"]])
+                else:
+                    missing.append(result)
+        if missing:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                for result, (url, value) in zip(missing, executor.map(fingerprint_file, [r["path"] for r in missing], chunksize=64)):
+                    result["simhash"] = value
+                    if index is not None and url and value is not None:
+                        remember(index, url, value)
+            if index is not None:
+                index.commit()
+        flag_duplicates(results)
+
+    noisy = [{k: v for k, v in r.items() if k != "simhash"} for r in results if r["rule"]]
+    return sorted(noisy, key=lambda r: r["path"]), len(files)
+
 
+# --- PLAN & APPLICATION ---
+def build_plan(output_dir=OUTPUT_DIR, rules=RULES, threads=CLEAN_NOISE_THREADS, index=None, workers=None):
+    noisy, scanned = find_noise(output_dir, rules, threads, index, workers)
+    return {
+        "generated": datetime.now().isoformat(timespec="seconds"),
+        "output_dir": str(output_dir),
+        "rules": list(rules),
+        "scanned": scanned,
+        "counts": dict(Counter(item["rule"] for item in noisy)),
+        "items": noisy,
+    }
+
+
+def remove_file(item, output_dir, quarantine_dir=None):
+    """Deletes (or moves under quarantine_dir, same relative path) one planned file; returns an error or None.
+
+    A file modified since the plan was made is left alone.
+    """
+    path = item["path"]
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return "disparu"
+    if "mtime" in item and (stat.st_size, stat.st_mtime) != (item.get("size"), item["mtime"]):
+        return "modifié depuis le plan"
+    try:
+        if quarantine_dir:
+            target = Path(quarantine_dir) / os.path.relpath(path, output_dir)
+            target.parent.mkdir(parents=True, exist_ok=True)
+            shutil.move(path, target)
+        else:
+            os.remove(path)
+    except OSError as e:
+        return str(e)
+    return None
+
+
+def apply_plan(plan, quarantine_dir=None, threads=CLEAN_NOISE_THREADS, index=None):
+    """Removes every planned file in bulk (thread pool), then journals the removals in the index."""
+    output_dir = plan["output_dir"]
+    items = plan["items"]
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        errors = list(executor.map(lambda item: remove_file(item, output_dir, quarantine_dir), items))
+    status = "quarantined" if quarantine_dir else "deleted"
+    done = 0
+    for item, error in zip(items, errors):
+        if error:
+            logger.warning(f"⚠️ Ignoré {os.path.basename(item['path'])} : {error}")
+            continue
+        done += 1
+        if index is not None:
+            index.mark_removed(item["path"], status)
+    if index is not None:
+        index.commit()
+    verb = f"mis en quarantaine dans {quarantine_dir}" if quarantine_dir else "supprimés"
+    logger.info(f"🗑️ {done} / {len(items)} fichiers {verb}")
+    return done
+
+
+def run_headless(args):
+    index = UrlIndex() if args.from_index or args.apply else None
+    try:
+        if args.plan_in:
+            with open(args.plan_in, "r", encoding="utf-8") as f:
+                plan = json.load(f)
+            logger.info(f"📋 Plan chargé : {args.plan_in} ({len(plan['items'])} fichiers)")
+        else:
+            if not OUTPUT_DIR.exists():
+                logger.error(f"❌ Dossier introuvable : {OUTPUT_DIR}")
+                return
+            plan = build_plan(OUTPUT_DIR, args.rules, args.threads, index if args.from_index else None, args.workers)
+            logger.info(f"📂 Fichiers scannés : {plan['scanned']}")
+            logger.info(f"⚠️ Bruit identifié : {len(plan['items'])} " + str(plan["counts"]))
+        if args.plan:
+            with open(args.plan, "w", encoding="utf-8") as f:
+                json.dump(plan, f, indent=2, ensure_ascii=False)
+            logger.info(f"📝 Plan écrit dans {args.plan}")
+        elif not args.apply:
+            json.dump(plan, sys.stdout, indent=2, ensure_ascii=False)
+            print()
+        if args.apply:
+            apply_plan(plan, args.quarantine, args.threads, index)
+    finally:
+        if index is not None:
+            index.close()
+
+
+# --- MODE INTERACTIF ---
 def clean_noise():
     if not OUTPUT_DIR.exists():
         logger.error(f"❌ Dossier introuvable : {OUTPUT_DIR}")
         return
 
     logger.info(f"🔍 Analyse en cours dans : {OUTPUT_DIR}...")
-    
-    noisy_files = []
-    scanned_count = 0
 
     # 1. Identification (Identify all candidates first)
-    for file_path in OUTPUT_DIR.rglob("*.md"):
-        scanned_count += 1
-        is_noisy, reason = is_noise(file_path)
-        if is_noisy:
-            noisy_files.append((file_path, reason))
+    noisy, scanned_count = find_noise(OUTPUT_DIR, INTERACTIVE_RULES)
+    noisy_files = [(Path(item["path"]), item["reason"]) for item in noisy]
 
     total_noise = len(noisy_files)
     logger.info(f"📂 Fichiers scannés : {scanned_count}")
@@ -55,7 +262,7 @@ def clean_noise():
 
     # 2. Validation & Deletion Logic
     deleted_count = 0
-    
+
     if total_noise < 30:
         logger.info("\n Validation un par un (< 30 fichiers) :")
         for file_path, reason in noisy_files:
@@ -79,7 +286,7 @@ def clean_noise():
             print(f"\n--- Lot {i+1} à {min(i+5, len(noisy_files))} sur {total_noise} ---")
             for fp, reason in batch:
                 print(f"  • {fp.name} ({reason})")
-            
+
             choice = input("❌ Supprimer ce lot ? (y/n) : ").lower()
             if choice == 'y':
                 for file_path, _ in batch:
@@ -97,4 +304,29 @@ def clean_noise():
     logger.info(f"🗑️ Total supprimés : {deleted_count} / {total_noise}")
 
 if __name__ == "__main__":
-    clean_noise()
+    parser = argparse.ArgumentParser(description="Anti-bruit : interactif par défaut, ou sans intervention (plan JSON puis application).")
+    parser.add_argument("--dry-run", action="store_true", help="Sans intervention : calcule le plan et l'affiche en JSON (rien n'est modifié)")
+    parser.add_argument("--plan", help="Écrit le plan JSON dans ce fichier")
+    parser.add_argument("--apply", nargs="?", const="", metavar="PLAN",
+                        help="Applique le plan (celui d'un fichier --plan précédent, sinon un plan calculé à la volée)")
+    parser.add_argument("--quarantine", nargs="?", const=str(QUARANTINE_DIR), metavar="DIR",
+                        help=f"Avec --apply : déplace au lieu de supprimer (défaut : {QUARANTINE_DIR})")
+    parser.add_argument("--rules", default=",".join(RULES), help=f"Règles actives parmi {','.join(RULES)}")
+    parser.add_argument("--threads", type=int, default=CLEAN_NOISE_THREADS, help="Lectures de fichiers en parallèle")
+    parser.add_argument("--workers", type=int, default=None, help="Processus SimHash (règle duplicate ; défaut : un par cœur)")
+    parser.add_argument("--from-index", action="store_true", help="Liste les fichiers depuis l'index SQLite au lieu de parcourir le dossier")
+    args = parser.parse_args()
+
+    args.rules = [r.strip() for r in args.rules.split(",") if r.strip()]
+    unknown = set(args.rules) - set(RULES)
+    if unknown:
+        parser.error(f"règle(s) inconnue(s) : {', '.join(sorted(unknown))}")
+    if args.quarantine and args.apply is None:
+        parser.error("--quarantine s'utilise avec --apply")
+    args.plan_in = args.apply or None
+    args.apply = args.apply is not None and not args.dry_run
+
+    if args.dry_run or args.plan or args.apply:
+        run_headless(args)
+    else:
+        clean_noise()
@@ -1,15 +1,123 @@
 from pathlib import Path
 
+
+def _env(name, default):
+    """NOTEBOOKLM_<name> or the default, for the settings others are derived from (see ENVIRONMENT OVERRIDES)."""
+    import ast
+    import os
+    raw = os.environ.get(f"NOTEBOOKLM_{name}")
+    if raw is None:
+        return default
+    return Path(raw) if isinstance(default, Path) else ast.literal_eval(raw)
+
+
 # --- PATHS ---
-BASE_DIR = Path(__file__).parent
+BASE_DIR = _env("BASE_DIR", Path(__file__).parent)
 URLS_FILE = BASE_DIR / "urls.txt"
 OUTPUT_DIR = Path(r"G:\Mon Drive\NotebookLM\NotebookLM_Sources")
-LOG_FILE = BASE_DIR / "processed_urls.log"
+LOG_FILE = BASE_DIR / "processed_urls.log"  # Legacy journal, imported once into INDEX_DB
+INDEX_DB = BASE_DIR / "url_index.db"  # SQLite URL/document index
+HTML_CACHE_DIR = BASE_DIR / "html_cache"  # Compressed raw HTML (enables offline re-extraction)
+METRICS_DIR = BASE_DIR / "reports"  # Per-run JSON reports + Prometheus textfile (<run>.prom)
+WORK_QUEUE_DB = BASE_DIR / "work_queue.db"  # Worker mode: shared lease queue (may sit on a mount shared by several hosts)
+QUARANTINE_DIR = BASE_DIR / "quarantine"  # clean_noise.py --apply --quarantine: noise is moved here instead of deleted
 
 # --- CRAWLER SETTINGS ---
 MIN_YEAR = 2022  # Configurable: Ignore content older than this year
 MAX_PAGES_PER_SITE = 50
-MAX_CONCURRENT_PAGES = 1
+MIN_CONTENT_LENGTH = _env("MIN_CONTENT_LENGTH", 500)  # Extracted pages shorter than this (chars) are rejected before metadata extraction
+MAX_CONCURRENT_PAGES = _env("MAX_CONCURRENT_PAGES", 4)  # Size of the shared page pool (sites crawled in parallel)
+MAX_PAGES_PER_DOMAIN = 1  # Concurrent fetches allowed on a single domain
+DOMAIN_DELAY = (1.5, 3.0)  # Random delay (seconds) between two requests to the same domain
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36"
+READY_TIMEOUTS = {  # Per wait kind: (min, default, max) timeout in ms; learned per domain in between
+    "load": (1000, 8000, 20000),
+    "scroll": (500, 3000, 6000),
+}
+READY_QUIET_MS = 500  # DOM considered settled after this long without mutation
+EXTRACTION_WORKERS = None  # Extraction processes (None = one per CPU core)
+EXTRACTION_QUEUE_SIZE = 16  # Raw pages allowed to wait for extraction before fetchers pause
+WRITER_THREADS = 4  # Parallel file writes to the output folder (Drive mounts have high per-file latency)
+WRITER_MAX_PENDING = 64  # Files in flight before the pipeline waits on the writer
+WRITER_FSYNC = False  # fsync each article before its rename (survives power loss, slower on Drive)
+
+# --- WORKER MODE (ingest_auto_crawl.py --worker) ---
+WORKER_LEASE_SECONDS = 300  # A domain lease not renewed for this long is handed to another worker (renewed every third)
+WORKER_POLL_SECONDS = 15  # Idle worker: delay between two claims while other workers still hold leases
+WORKER_MAX_ATTEMPTS = 3  # Leases of a domain (crashed workers included) before it is marked failed for the run
+WORKER_CONCURRENT_DOMAINS = MAX_CONCURRENT_PAGES  # Domain leases crawled at once by one worker
+WORKER_QUEUE_RETRIES = 5  # Work queue writes retried while the shared file is locked (a busy lock must not burn a lease)
+
+# --- MANUAL INGEST ---
+MANUAL_CONCURRENCY = 4  # Pages of the warm browser used by ingest_manual.py (batch and daemon)
+MANUAL_DAEMON_PORT = 8765  # ingest_manual.py --serve listens on 127.0.0.1 only
+MANUAL_INDEX_RETRIES = 5  # Index writes retried while a running crawler holds the write lock
+
+# --- BROWSER RESOURCE POLICY (resource_policy.py) ---
+# Blocked inside the browser context by URL pattern: allowed requests never reach Python
+BLOCKED_RESOURCE_TYPES = ["image", "media", "font", "stylesheet"]
+BLOCKED_HOSTS = {  # Third-party hosts blocked on every site (subdomains included), by category
+    # Tracker and widget hosts only, never a vendor's main domain: its own blog must stay crawlable
+    "analytics": [
+        "google-analytics.com", "googletagmanager.com", "analytics.google.com", "segment.io", "cdn.segment.com",
+        "cdn.mxpnl.com", "api-js.mixpanel.com", "cdn.amplitude.com", "api2.amplitude.com", "static.hotjar.com",
+        "script.hotjar.com", "heapanalytics.com", "edge.fullstory.com", "rs.fullstory.com", "clarity.ms",
+        "plausible.io/js", "js-agent.newrelic.com", "nr-data.net", "browser.sentry-cdn.com", "ingest.sentry.io",
+        "datadoghq-browser-agent.com", "hs-analytics.net", "hs-scripts.com", "hs-banner.com", "track.hubspot.com",
+        "marketo.net", "pi.pardot.com", "quantserve.com", "scorecardresearch.com", "static.chartbeat.com",
+        "cdn.parsely.com", "matomo.cloud", "widget.intercom.io", "intercomcdn.com",
+    ],
+    "ads": [
+        "doubleclick.net", "googlesyndication.com", "googleadservices.com", "adservice.google.com",
+        "facebook.net", "connect.facebook.net", "ads-twitter.com", "ads.linkedin.com", "px.ads.linkedin.com",
+        "snap.licdn.com", "bat.bing.com", "cdn.taboola.com", "trc.taboola.com", "widgets.outbrain.com",
+        "static.criteo.net", "adnxs.com", "amazon-adsystem.com", "redditstatic.com",
+    ],
+    "consent": [
+        "cookielaw.org", "consent.cookiebot.com", "consensu.org", "app.usercentrics.eu", "consent.trustarc.com",
+        "privacy-center.org", "cmp.quantcast.com", "cmp.osano.com", "app.termly.io", "cdn.iubenda.com",
+    ],
+    "embeds": [
+        "youtube.com/embed", "youtube-nocookie.com", "player.vimeo.com", "platform.twitter.com",
+        "platform.linkedin.com", "disqus.com/embed.js", "disquscdn.com", "s7.addthis.com", "platform-api.sharethis.com",
+        "embed.podcasts.apple.com", "open.spotify.com/embed", "widget.trustpilot.com", "js.driftt.com",
+    ],
+}
+RESOURCE_OVERRIDES = {  # Per crawled domain: {"allow": [types/categories let through], "block": [extra hosts]}
+    # "example.com": {"allow": ["stylesheet", "consent"], "block": ["cdn.example-widgets.com"]},
+}
+
+# --- HTTP FAST PATH ---
+HTTP_FAST_PATH = True  # Try a plain pooled HTTP request (httpx) before opening the page in Chromium
+HTTP_MAX_CONNECTIONS = 20
+HTTP_TIMEOUT = 20  # seconds
+BROWSER_ESCALATION_THRESHOLD = 3  # Escalations without any usable HTTP page before a domain goes browser-only
+
+# --- FEED DISCOVERY ---
+FEED_DISCOVERY = True  # Read sitemaps / RSS / Atom before falling back to the scroll crawler
+MAX_SITEMAPS = 20  # Child sitemaps followed per source (sitemap indexes can be huge)
+IN_PAGE_LINK_FILTER = True  # Scroll fallback: filter links inside the page, only candidates are sent back to Python
+SOURCE_FEEDS = {  # Known feeds per urls.txt entry (probed first; others are auto-detected)
+    "https://huggingface.co/blog": ["https://huggingface.co/blog/feed.xml"],
+    "https://aws.amazon.com/blogs/machine-learning/": ["https://aws.amazon.com/blogs/machine-learning/feed/"],
+    "https://blogs.nvidia.com/blog/category/deep-learning/": ["https://blogs.nvidia.com/blog/category/deep-learning/feed/"],
+    "https://blogs.microsoft.com/ai/": ["https://blogs.microsoft.com/ai/feed/"],
+}
+SOURCE_WEIGHTS = {  # Crawl priority per urls.txt entry (default 1.0): heavier sources are started first
+    # "https://openai.com/news/": 2.0,
+}
+
+# --- NEAR-DUPLICATES ---
+NEAR_DUPLICATE_CHECK = True  # Skip articles whose SimHash is this close to an already-saved one
+SIMHASH_MAX_DISTANCE = 3  # Max differing bits (out of 64) to call two documents near-duplicates
+
+# --- NOISE CLEANUP (clean_noise.py) ---
+CLEAN_NOISE_THREADS = 16  # Parallel file reads (Drive mounts have high per-file latency)
+NOISE_MIN_BODY_LENGTH = MIN_CONTENT_LENGTH  # Saved bodies shorter than this (chars) are flagged "short"
+NOISE_BOILERPLATE_RATIO = 0.5  # Share of the body (chars) made of boilerplate lines above which a file is flagged
+
+# --- CLASSIFICATION ---
+CLASSIFY_WORD_BOUNDARY = False  # True: keywords only match whole words ("rag" no longer hits "storage")
 
 # --- KEYWORDS & PATTERNS ---
 KEYWORDS = [
@@ -24,6 +132,14 @@ NOISE_KEYWORDS = [
     "javascript", "void_0", "uncategorized_misc", "newsletter"
 ]
 
+NOISE_URL_PATTERNS = ["/label/", "/tag/", "/category/", "/page/", "share="]  # Saved URLs that are index/pagination pages
+
+BOILERPLATE_PATTERNS = [  # Body lines that are page chrome, not article text
+    "cookie", "subscribe", "newsletter", "sign up", "sign in", "log in", "all rights reserved",
+    "privacy policy", "terms of service", "terms of use", "share on", "share this", "follow us",
+    "read more", "related posts", "skip to content", "back to top", "copyright", "©"
+]
+
 SKIP_PATTERNS = [
      "twitter.com", "facebook.com", "linkedin.com", "reddit.com", 
      "/share", "/intent/tweet", "/login", "/signup", ".xml", "/rss",
@@ -57,3 +173,16 @@ CATEGORIES = {
         "News": ["startup", "funding", "regulation", "policy", "ethics", "announcement"]
     }
 }
+
+# --- ENVIRONMENT OVERRIDES ---
+# NOTEBOOKLM_<SETTING> overrides any setting above, for benchmarks, CI and sandboxes.
+# Paths take a plain path; other settings take a Python literal. For example:
+#   NOTEBOOKLM_OUTPUT_DIR=/tmp/corpus NOTEBOOKLM_DOMAIN_DELAY="(0, 0)" python ingest_auto_crawl.py
+# Settings other ones default to (BASE_DIR, MIN_CONTENT_LENGTH, MAX_CONCURRENT_PAGES) are read
+# through _env where they are defined, so the derived defaults follow their override.
+def _apply_env_overrides(settings):
+    for name, value in list(settings.items()):
+        if name.isupper():
+            settings[name] = _env(name, value)
+
+_apply_env_overrides(globals())
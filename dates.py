@@ -0,0 +1,71 @@
+import re
+from datetime import date
+from email.utils import parsedate_to_datetime
+from functools import lru_cache
+
+# Tiered date engine: ISO 8601 and RFC 2822 are parsed directly (trafilatura
+# metadata, sitemaps, <time datetime> and RSS cover nearly every date we see);
+# only the remaining free-form strings reach dateparser, imported on first use.
+# Results are memoized: the same strings repeat across a site.
+
+ISO_RE = re.compile(r"^(\d{4})-(\d{2})-(\d{2})(?:$|[T ])")
+RFC_2822_RE = re.compile(r"^(?:[A-Za-z]{3},\s*)?\d{1,2}\s+[A-Za-z]{3}\s+\d{4}\s+\d{1,2}:\d{2}")
+# /2024/03/15/, /2024/03/, /2024-03-15-slug, /2024/ (first match wins, most precise first)
+URL_DATE_RES = [
+    re.compile(r"/((?:19|20)\d{2})[/-](0[1-9]|1[0-2])[/-](0[1-9]|[12]\d|3[01])(?=[/\-_.]|$)"),
+    re.compile(r"/((?:19|20)\d{2})/(0[1-9]|1[0-2])/"),
+    re.compile(r"/((?:19|20)\d{2})/"),
+]
+
+_dateparser_parse = None
+
+
+def _dateparser(raw):
+    global _dateparser_parse
+    if _dateparser_parse is None:
+        from dateparser import parse  # ~0.5s import: only paid if a string misses the fast paths
+        _dateparser_parse = parse
+    return _dateparser_parse(raw)
+
+
+def _valid(year, month, day):
+    try:
+        return date(int(year), int(month), int(day)).isoformat()
+    except ValueError:
+        return None
+
+
+@lru_cache(maxsize=8192)
+def _normalize(raw):
+    match = ISO_RE.match(raw)
+    if match:
+        # The date as written (no timezone shift), which is also what dateparser returns
+        valid = _valid(*match.groups())
+        if valid: return valid
+    if RFC_2822_RE.match(raw):
+        try:
+            return parsedate_to_datetime(raw).strftime("%Y-%m-%d")
+        except (TypeError, ValueError):
+            pass
+    try:
+        parsed = _dateparser(raw)
+        return parsed.strftime("%Y-%m-%d") if parsed else None
+    except Exception:
+        return None
+
+
+def normalize_date(raw_date):
+    """Any date representation -> 'YYYY-MM-DD' (None if unparseable)."""
+    if not raw_date: return None
+    return _normalize(str(raw_date).strip())
+
+
+def date_from_url(url):
+    """Date encoded in an article URL ('YYYY-MM-DD', with -01 for missing parts), or None."""
+    for pattern in URL_DATE_RES:
+        match = pattern.search(url)
+        if match:
+            parts = match.groups() + ("01",) * (3 - len(match.groups()))
+            valid = _valid(*parts)
+            if valid: return valid
+    return None
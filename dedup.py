@@ -0,0 +1,156 @@
+import argparse
+import hashlib
+import json
+import re
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urlparse, urlunparse, parse_qsl, urlencode
+
+from config import OUTPUT_DIR, SIMHASH_MAX_DISTANCE
+from utils import setup_logging, parse_article
+from url_index import UrlIndex
+
+logger = setup_logging("dedup")
+
+TRACKING_PARAMS = re.compile(r"^(utm_.*|fbclid|gclid|mc_cid|mc_eid|ref|ref_src|source|amp|output|s_kwcid|trk)$", re.IGNORECASE)
+WORD_RE = re.compile(r"\w+")
+BANDS = 4  # 64-bit fingerprint = 4 bands of 16 bits (>= 1 identical band whenever distance <= 3)
+BAND_BITS = 64 // BANDS
+
+
+# --- URL CANONICALIZATION ---
+def canonicalize_url(url):
+    """Collapses the usual variants of one article URL (www., tracking params, fragments, trailing slash, AMP)."""
+    try:
+        parts = urlparse(url.strip())
+    except ValueError:
+        return url
+    host = parts.netloc.lower()
+    if host.startswith("www."): host = host[4:]
+    if host.endswith(":80") or host.endswith(":443"): host = host.rsplit(":", 1)[0]
+    path = re.sub(r"/amp(?=/|$)", "", parts.path)
+    path = re.sub(r"/index\.html?$", "/", path)
+    path = path.rstrip("/") or "/"
+    query = urlencode(sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if not TRACKING_PARAMS.match(k)))
+    return urlunparse(("https" if parts.scheme in ("http", "https") else parts.scheme, host, path, "", query, ""))
+
+
+# --- SIMHASH ---
+def simhash(text, shingle=3):
+    """64-bit SimHash over word 3-shingles (None when the text is too short to fingerprint)."""
+    tokens = WORD_RE.findall(text.lower())
+    if len(tokens) < shingle * 4:
+        return None
+    hashes = [
+        format(int.from_bytes(hashlib.blake2b(" ".join(tokens[i:i + shingle]).encode("utf-8"), digest_size=8).digest(), "big"), "064b")
+        for i in range(len(tokens) - shingle + 1)
+    ]
+    half = len(hashes) / 2
+    value = 0
+    for i, column in enumerate(zip(*hashes)):  # Column i = bit (63 - i) of every shingle hash
+        if column.count("1") > half:
+            value |= 1 << (63 - i)
+    return value
+
+
+def hamming(a, b):
+    return bin(a ^ b).count("1")
+
+
+def bands(value):
+    return [(value >> (i * BAND_BITS)) & ((1 << BAND_BITS) - 1) for i in range(BANDS)]
+
+
+def to_signed(value):
+    """SQLite INTEGER is signed 64-bit."""
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def to_unsigned(value):
+    return value + (1 << 64) if value < 0 else value
+
+
+# --- INDEX ---
+def remember(index, url, value):
+    index.add_fingerprint(url, to_signed(value), [to_signed(b) for b in bands(value)])
+
+
+def find_near_duplicate(index, url, value, max_distance=SIMHASH_MAX_DISTANCE):
+    """Closest already-saved document within max_distance bits, as (url, distance), or None."""
+    best = None
+    canonical = canonicalize_url(url)
+    for other_url, other in index.fingerprint_candidates([to_signed(b) for b in bands(value)]):
+        if other_url == url or canonicalize_url(other_url) == canonical: continue  # Its own (older) fingerprint
+        distance = hamming(value, to_unsigned(other))
+        if distance <= max_distance and (best is None or distance < best[1]):
+            best = (other_url, distance)
+    return best
+
+
+# --- BATCH MODE ---
+def fingerprint_file(path):
+    """Worker process: (url, simhash) of a saved article."""
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        header, body = parse_article(f.read())
+    return header.get("URL"), simhash(body)
+
+
+def rebuild(index, output_dir=OUTPUT_DIR, workers=None):
+    """Fingerprints the saved articles not yet in the index (corpus saved before dedup existed)."""
+    index.reconcile(output_dir)
+    paths = index.unfingerprinted_paths()
+    added = 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for url, value in executor.map(fingerprint_file, paths, chunksize=64):
+            if url and value is not None:
+                remember(index, url, value)
+                added += 1
+    index.commit()
+    logger.info(f"🧬 {added} new fingerprints ({len(paths)} files read)")
+
+
+def clusters(index, max_distance=SIMHASH_MAX_DISTANCE):
+    """Groups of near-duplicate documents (union-find over LSH band buckets)."""
+    rows = [(url, to_unsigned(value), path) for url, value, path in index.fingerprints()]
+    parent = list(range(len(rows)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for band in range(BANDS):
+        buckets = {}
+        for i, (_, value, _) in enumerate(rows):
+            buckets.setdefault(bands(value)[band], []).append(i)
+        for members in buckets.values():
+            for a in range(len(members)):
+                for b in range(a + 1, len(members)):
+                    i, j = members[a], members[b]
+                    if find(i) != find(j) and hamming(rows[i][1], rows[j][1]) <= max_distance:
+                        parent[find(i)] = find(j)
+
+    groups = {}
+    for i, (url, _, path) in enumerate(rows):
+        groups.setdefault(find(i), []).append({"url": url, "path": path})
+    return [g for g in groups.values() if len(g) > 1]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Near-duplicate report over the saved corpus.")
+    parser.add_argument("--rebuild", action="store_true", help="Fingerprint saved articles missing from the index first")
+    parser.add_argument("--json", help="Write the clusters to this JSON file")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    index = UrlIndex()
+    if args.rebuild:
+        rebuild(index, workers=args.workers)
+    found = clusters(index)
+    logger.info(f"🧬 {len(found)} near-duplicate clusters ({sum(len(c) for c in found)} documents)")
+    for cluster in found:
+        logger.info("   • " + " | ".join(d["url"] for d in cluster))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(found, f, indent=2, ensure_ascii=False)
+    index.close()
@@ -0,0 +1,155 @@
+import re
+import xml.etree.ElementTree as ET
+from urllib.parse import urljoin, urlparse
+
+from config import MIN_YEAR, SOURCE_FEEDS, MAX_SITEMAPS
+from utils import setup_logging, normalize_date
+from metrics import metrics
+
+logger = setup_logging("discovery")
+
+FEED_LINK_RE = re.compile(
+    r'<link[^>]+type=["\']application/(?:rss|atom)\+xml["\'][^>]*>', re.IGNORECASE
+)
+HREF_RE = re.compile(r'href=["\']([^"\']+)["\']', re.IGNORECASE)
+COMMON_FEED_PATHS = ["feed/", "rss/", "feed.xml", "rss.xml", "atom.xml", "index.xml"]
+
+
+def _local(tag):
+    """Tag name without its XML namespace."""
+    return tag.rsplit("}", 1)[-1].lower()
+
+
+def _child_text(node, *names):
+    for child in node:
+        if _local(child.tag) in names and child.text:
+            return child.text.strip()
+    return None
+
+
+def parse_feed(xml_bytes):
+    """Parses a sitemap, sitemap index, RSS or Atom document.
+
+    Returns (kind, entries, sitemaps): entries are (url, raw_date) article
+    candidates, sitemaps are (url, raw_date) child sitemaps of a sitemap index.
+    """
+    root = ET.fromstring(xml_bytes)
+    kind = _local(root.tag)
+    entries, sitemaps = [], []
+    if kind == "sitemapindex":
+        for node in root:
+            loc = _child_text(node, "loc")
+            if loc: sitemaps.append((loc, _child_text(node, "lastmod")))
+    elif kind == "urlset":
+        for node in root:
+            loc = _child_text(node, "loc")
+            if loc: entries.append((loc, _child_text(node, "lastmod")))
+    elif kind == "rss" or kind == "rdf":
+        for item in root.iter():
+            if _local(item.tag) == "item":
+                link = _child_text(item, "link", "guid")
+                if link: entries.append((link, _child_text(item, "pubdate", "date", "updated")))
+    elif kind == "feed":
+        for entry in root:
+            if _local(entry.tag) != "entry": continue
+            link = None
+            for child in entry:
+                if _local(child.tag) == "link" and child.get("rel", "alternate") == "alternate":
+                    link = child.get("href")
+                    break
+            if link: entries.append((link, _child_text(entry, "published", "updated")))
+    return kind, entries, sitemaps
+
+
+def _is_recent(raw_date, min_year):
+    """Unknown dates are kept: the extraction date check still applies later."""
+    date_iso = normalize_date(raw_date) if raw_date else None
+    return date_iso, not date_iso or int(date_iso[:4]) >= min_year
+
+
+class FeedDiscovery:
+    """Sitemap / RSS / Atom discovery over the pooled HTTP client.
+
+    Sources are probed in order (SOURCE_FEEDS, <link rel="alternate"> on the
+    listing page, common feed paths, robots.txt sitemaps, /sitemap.xml) and
+    the first one yielding in-scope entries wins. Entries older than
+    MIN_YEAR are dropped before any article is fetched.
+    """
+
+    def __init__(self, http, scheduler, min_year=MIN_YEAR):
+        self.http = http
+        self.scheduler = scheduler
+        self.min_year = min_year
+
+    async def _get(self, url):
+        async with self.scheduler.slot(url):
+            try:
+                status, body = await self.http.get_bytes(url)
+            except Exception:
+                return None
+        return body if status == 200 and body else None
+
+    async def _feed_urls(self, base_url):
+        for url in SOURCE_FEEDS.get(base_url, []):
+            yield url
+        listing = await self._get(base_url)
+        if listing:
+            head = listing[:200000].decode("utf-8", "ignore")
+            for tag in FEED_LINK_RE.findall(head):
+                href = HREF_RE.search(tag)
+                if href: yield urljoin(base_url, href.group(1))
+        base = base_url if base_url.endswith("/") else base_url + "/"
+        for path in COMMON_FEED_PATHS:
+            yield urljoin(base, path)
+        root = f"{urlparse(base_url).scheme}://{urlparse(base_url).netloc}/"
+        robots = await self._get(root + "robots.txt")
+        if robots:
+            for line in robots.decode("utf-8", "ignore").splitlines():
+                if line.lower().startswith("sitemap:"):
+                    yield line.split(":", 1)[1].strip()
+        yield root + "sitemap.xml"
+
+    async def _read(self, url, in_scope):
+        """Entries of one feed (sitemap indexes are followed, skipping child sitemaps older than MIN_YEAR)."""
+        pending, seen, found, dropped = [url], set(), [], 0
+        while pending and len(seen) < MAX_SITEMAPS:
+            current = pending.pop(0)
+            if current in seen: continue
+            seen.add(current)
+            body = await self._get(current)
+            if not body: continue
+            try:
+                kind, entries, sitemaps = parse_feed(body)
+            except ET.ParseError:
+                continue
+            for loc, raw_date in sitemaps:
+                if _is_recent(raw_date, self.min_year)[1]:
+                    pending.append(loc)
+            for loc, raw_date in entries:
+                if not in_scope(loc):
+                    metrics.count("filtered", "url_rules")
+                    continue
+                date_iso, recent = _is_recent(raw_date, self.min_year)
+                if recent:
+                    # <lastmod> is a modification date: good for ordering, not a publication date
+                    found.append((loc, date_iso, kind != "urlset"))
+                else:
+                    dropped += 1
+        metrics.count("filtered", "feed_too_old", dropped)
+        return found, dropped
+
+    async def discover(self, base_url, in_scope):
+        """Returns [(url, date_iso, is_publication_date)] newest first, or None when the source has no usable feed."""
+        tried = set()
+        feed_urls = self._feed_urls(base_url)
+        try:
+            async for feed_url in feed_urls:
+                if feed_url in tried: continue
+                tried.add(feed_url)
+                found, dropped = await self._read(feed_url, in_scope)
+                if found or dropped:
+                    logger.info(f"📰 {base_url}: {len(found)} entries from {feed_url} ({dropped} older than {self.min_year} dropped)")
+                    return sorted(found, key=lambda e: e[1] or "", reverse=True)
+        finally:
+            await feed_urls.aclose()
+        return None
@@ -0,0 +1,43 @@
+import time
+from copy import deepcopy
+
+import trafilatura
+from trafilatura.utils import load_html
+
+from config import MIN_CONTENT_LENGTH
+
+
+def _ms(start):
+    return round((time.perf_counter() - start) * 1000, 1)
+
+
+def extract_document(html_content, url=None, min_length=MIN_CONTENT_LENGTH):
+    """Parses the HTML once and derives both the markdown body and the metadata from that tree.
+
+    Metadata is only computed when the body passes `min_length`, so thin pages
+    that are about to be rejected cost a single parse + extract.
+    Returns a dict: content, metadata (trafilatura Document or None), timings (ms).
+    """
+    timings = {}
+    start = time.perf_counter()
+    tree = load_html(html_content)
+    timings["parse_ms"] = _ms(start)
+    if tree is None:
+        return {"content": None, "metadata": None, "timings": timings}
+
+    # trafilatura prunes the tree it is given: work on a copy (a C-level copy is far cheaper than a re-parse)
+    start = time.perf_counter()
+    content = trafilatura.extract(deepcopy(tree), url=url, output_format="markdown", include_tables=True)
+    timings["extract_ms"] = _ms(start)
+
+    if not content or len(content) < min_length:
+        return {"content": content, "metadata": None, "timings": timings}
+
+    start = time.perf_counter()
+    metadata = trafilatura.extract_metadata(tree, default_url=url)
+    timings["metadata_ms"] = _ms(start)
+    return {"content": content, "metadata": metadata, "timings": timings}
+
+
+def format_timings(timings):
+    return ", ".join(f"{k[:-3]} {v}ms" for k, v in timings.items())
@@ -0,0 +1,161 @@
+import re
+from collections import defaultdict
+
+from config import (
+    USER_AGENT, HTTP_FAST_PATH, HTTP_MAX_CONNECTIONS, HTTP_TIMEOUT,
+    BROWSER_ESCALATION_THRESHOLD
+)
+from utils import setup_logging, get_domain
+from metrics import metrics
+
+try:
+    import httpx  # Optional: without it every page goes through the browser
+except ImportError:
+    httpx = None
+
+logger = setup_logging("fetcher")
+
+CHALLENGE_MARKERS = re.compile(
+    r"cf-browser-verification|challenge-platform|cf_chl_|just a moment\.\.\.|attention required!"
+    r"|captcha|please enable javascript|enable javascript to|you need to enable javascript"
+    r"|checking your browser",
+    re.IGNORECASE
+)
+
+
+def gated_reason(status, html_content):
+    """Why a plain HTTP response cannot be trusted (None if it looks like a real server-rendered page)."""
+    if status is None:
+        return "http_error"
+    if status >= 400:  # 403/429/503 are the usual bot walls
+        return f"status_{status}"
+    if not html_content:
+        return "empty"
+    # Challenge pages are small: only look at the head of the document
+    if CHALLENGE_MARKERS.search(html_content[:20000]):
+        return "challenge"
+    return None
+
+
+class HttpFetcher:
+    """Pooled keep-alive async HTTP client (one connection pool shared by every site)."""
+
+    def __init__(self, max_connections=HTTP_MAX_CONNECTIONS, timeout=HTTP_TIMEOUT):
+        self.client = httpx.AsyncClient(
+            headers={
+                "User-Agent": USER_AGENT,
+                "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+                "Accept-Language": "en-US,en;q=0.9",
+            },
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            timeout=timeout,
+            follow_redirects=True,
+        )
+
+    async def get(self, url, headers=None):
+        """Returns (status, html, response headers). html is None for non-HTML responses."""
+        response = await self.client.get(url, headers=headers)
+        if "html" not in response.headers.get("content-type", "html"):
+            return response.status_code, None, response.headers
+        return response.status_code, response.text, response.headers
+
+    async def get_bytes(self, url):
+        """Returns (status, raw body) whatever the content type (feeds, sitemaps, robots.txt)."""
+        response = await self.client.get(url)
+        return response.status_code, response.content
+
+    async def close(self):
+        await self.client.aclose()
+
+
+class FetchTier:
+    """HTTP first, Playwright only when the page looks JS-gated.
+
+    A domain is switched to browser-only once it has escalated
+    BROWSER_ESCALATION_THRESHOLD times without a single usable HTTP page;
+    the flag is persisted in the URL index so later runs skip the HTTP try.
+    """
+
+    def __init__(self, pool, scheduler, needs_browser=(), use_http=HTTP_FAST_PATH, readiness=None, cache=None):
+        self.pool = pool
+        self.scheduler = scheduler
+        self.readiness = readiness
+        self.cache = cache
+        self.http = HttpFetcher() if use_http and httpx else None
+        self.needs_browser = set(needs_browser)
+        self.stats = defaultdict(lambda: {"http_ok": 0, "escalated": 0})
+        if use_http and not httpx:
+            logger.warning("⚠️ httpx not installed: HTTP fast path disabled (pip install httpx)")
+
+    def uses_http(self, url):
+        """False for browser-only domains, and for pages already rendered by the browser: their HTTP
+        response is a JS shell, which would only replace the rendered copy in the cache."""
+        if self.http is None or get_domain(url) in self.needs_browser:
+            return False
+        return not self.cache or self.cache.tier(url) != "browser"
+
+    def cached_tier(self, url):
+        return self.cache.tier(url) if self.cache else None
+
+    async def fetch(self, url):
+        """Returns (html, via) where via is 'http', 'browser' or 'cache' (page unchanged since it was cached)."""
+        if self.uses_http(url):
+            # Conditional request when the page is cached: an unchanged page costs a 304
+            headers = self.cache.conditional_headers(url) if self.cache else None
+            async with self.scheduler.slot(url):
+                try:
+                    with metrics.span("http_get", url):
+                        status, html_content, response_headers = await self.http.get(url, headers)
+                    if status == 304:
+                        cached = self.cache.load(url)
+                        if cached is not None:
+                            self.cache.touch(url)
+                            return cached, "cache"
+                        # Validators without a blob (cache dir wiped): ask for the full page
+                        status, html_content, response_headers = await self.http.get(url)
+                except Exception as e:
+                    logger.debug(f"HTTP fetch failed for {url}: {e}")
+                    status, html_content, response_headers = None, None, {}
+            reason = gated_reason(status, html_content)
+            if not reason:
+                # Counted as usable only once extraction confirms it (see note_http_ok)
+                return html_content, self._cache(url, html_content, "http", response_headers)
+            self.note_escalation(url, reason)
+        return await self.fetch_browser(url)
+
+    def _cache(self, url, html_content, via, response_headers=None):
+        if not self.cache:
+            return via
+        response_headers = response_headers or {}
+        _, changed = self.cache.store(url, html_content, response_headers.get("etag"), response_headers.get("last-modified"), via)
+        return via if changed else "cache"
+
+    async def fetch_browser(self, url):
+        """Returns (html, via) where via is 'browser', or 'cache' when the rendered page is unchanged."""
+        async with self.scheduler.slot(url), self.pool.acquire() as page:
+            with metrics.span("goto", url):
+                await page.goto(url, timeout=30000, wait_until="domcontentloaded")
+            if self.readiness:
+                # Pages reaching the browser are mostly JS-rendered: let them settle (baseline: no wait)
+                with metrics.span("ready_wait", url):
+                    await self.readiness.wait_ready(page, url, baseline=0)
+            with metrics.span("content", url):
+                html_content = await page.content()
+        return html_content, self._cache(url, html_content, "browser")
+
+    def note_http_ok(self, url):
+        self.stats[get_domain(url)]["http_ok"] += 1
+
+    def note_escalation(self, url, reason):
+        domain = get_domain(url)
+        stats = self.stats[domain]
+        stats["escalated"] += 1
+        metrics.count("browser_fallback", reason)
+        logger.info(f"🌐 Browser fallback ({reason}): {url}")
+        if stats["http_ok"] == 0 and stats["escalated"] >= BROWSER_ESCALATION_THRESHOLD and domain not in self.needs_browser:
+            self.needs_browser.add(domain)
+            logger.info(f"🌐 {domain} flagged as browser-only")
+
+    async def close(self):
+        if self.http:
+            await self.http.close()
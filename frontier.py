@@ -0,0 +1,90 @@
+from datetime import date
+
+from config import SOURCE_WEIGHTS
+from url_index import now_iso
+from utils import setup_logging
+
+logger = setup_logging("frontier")
+
+
+def priority(date_iso, position, weight=1.0):
+    """Higher is fetched first. Dated entries decay with age (a month old = half); undated
+    ones fall back on their listing position, since blogs list their newest posts first."""
+    if date_iso:
+        try:
+            age = max(0, (date.today() - date.fromisoformat(date_iso[:10])).days)
+            return weight / (1 + age / 30)
+        except ValueError:
+            pass
+    return weight * 0.5 / (1 + position / 20)
+
+
+class Frontier:
+    """Persistent, prioritized crawl frontier (tables in the URL index).
+
+    A crawl run lasts until every source of urls.txt has been finished; if
+    the crawler dies before that, the next start resumes the same run:
+    finished sources are skipped, discovered ones reuse their stored
+    candidates (no rescroll), and the per-site budget already spent is kept.
+    """
+
+    def __init__(self, index, weights=SOURCE_WEIGHTS, run=None):
+        self.index = index
+        self.weights = weights
+        self.run = index.crawl_run()
+        if run:
+            # Worker mode: the run belongs to the shared work queue
+            if self.run != run:
+                index.start_crawl_run(run)
+            self.run = run
+            self.sites = index.frontier_sites(run)
+        elif self.run:
+            self.sites = index.frontier_sites(self.run)
+            done = sum(1 for _, finished in self.sites.values() if finished)
+            logger.info(f"⏯️ Resuming crawl run {self.run} ({done}/{len(self.sites)} sources finished)")
+        else:
+            self.run = now_iso()
+            index.start_crawl_run(self.run)
+            self.sites = {}
+
+    def reload(self):
+        """Re-reads the sources' state (worker mode: another process may have discovered or finished one)."""
+        self.sites = self.index.frontier_sites(self.run)
+
+    def order(self, sites):
+        """Heaviest sources first (stable for equal weights)."""
+        return sorted(sites, key=lambda site: -self.weights.get(site, 1.0))
+
+    def is_discovered(self, site):
+        return site in self.sites
+
+    def is_finished(self, site):
+        return bool(self.sites.get(site, (None, None))[1])
+
+    def add(self, site, entries):
+        """Checkpoints a source's candidates: entries are (url, date_iso, is_publication_date) in listing order."""
+        weight = self.weights.get(site, 1.0)
+        rows = [(url, priority(date_iso, position, weight), position, date_iso, published)
+                for position, (url, date_iso, published) in enumerate(entries)]
+        self.index.add_frontier(site, self.run, rows)
+        self.sites[site] = (now_iso(), None)
+
+    def pending(self, site):
+        """[(url, date_iso, is_publication_date)] not fetched yet in this run, freshest first."""
+        return [(url, date_iso, bool(published)) for url, date_iso, published in self.index.frontier_pending(site, self.run)]
+
+    def saved(self, site):
+        return self.index.frontier_saved(site, self.run)
+
+    def done(self, url, status):
+        self.index.frontier_done(url, status)
+
+    def finish(self, site):
+        self.index.finish_frontier_site(site, self.run)
+        self.sites[site] = (self.sites.get(site, (None, None))[0], now_iso())
+
+    def finish_run(self, sites):
+        """Closes the run once every source is finished; the next start rediscovers everything."""
+        if all(self.is_finished(site) for site in sites):
+            self.index.finish_crawl_run()
+            logger.info(f"🏁 Crawl run {self.run} complete")
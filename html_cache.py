@@ -0,0 +1,84 @@
+import gzip
+import hashlib
+import os
+
+from config import HTML_CACHE_DIR
+from url_index import now_iso
+
+try:
+    import zstandard  # Optional: smaller and much faster than gzip (pip install zstandard)
+except ImportError:
+    zstandard = None
+
+
+class HtmlCache:
+    """Content-addressed, compressed store of fetched HTML.
+
+    Blobs live in HTML_CACHE_DIR/<sha[:2]>/<sha>.html.zst (or .html.gz without
+    zstandard), so identical pages are stored once. Per-URL validators (ETag,
+    Last-Modified), the content hash and the tier that fetched the page
+    ('http' or 'browser') are kept in the URL index.
+    """
+
+    def __init__(self, index, cache_dir=HTML_CACHE_DIR):
+        self.index = index
+        self.cache_dir = cache_dir
+        self.suffix = ".html.zst" if zstandard else ".html.gz"
+
+    def _compress(self, data):
+        if zstandard:
+            return zstandard.ZstdCompressor(level=10).compress(data)
+        return gzip.compress(data, compresslevel=6)
+
+    @staticmethod
+    def _decompress(blob, data):
+        if blob.endswith(".zst"):
+            return zstandard.ZstdDecompressor().decompress(data)
+        return gzip.decompress(data)
+
+    def store(self, url, html_content, etag=None, last_modified=None, via=None):
+        """Caches a page; returns (content_hash, changed) where changed compares with the previous version."""
+        data = html_content.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        previous = self.index.cache_entry(url)
+        blob = f"{digest[:2]}/{digest}{self.suffix}"
+        path = self.cache_dir / blob
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_name(path.name + ".tmp")
+            tmp.write_bytes(self._compress(data))
+            os.replace(tmp, path)
+        self.index.record_cache(url, digest, blob, etag, last_modified, now_iso(), via)
+        return digest, not previous or previous["hash"] != digest
+
+    def load(self, url):
+        entry = self.index.cache_entry(url)
+        if not entry:
+            return None
+        try:
+            data = (self.cache_dir / entry["blob"]).read_bytes()
+        except OSError:
+            return None
+        return self._decompress(entry["blob"], data).decode("utf-8")
+
+    def conditional_headers(self, url):
+        """If-None-Match / If-Modified-Since for a revalidation request ({} if nothing cached)."""
+        entry = self.index.cache_entry(url)
+        headers = {}
+        if entry and entry["etag"]:
+            headers["If-None-Match"] = entry["etag"]
+        if entry and entry["last_modified"]:
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def tier(self, url):
+        """'http' or 'browser': which fetch produced the cached page (None if unknown)."""
+        entry = self.index.cache_entry(url)
+        return entry["via"] if entry else None
+
+    def touch(self, url):
+        """Revalidated (304): only the check time changes."""
+        self.index.touch_cache(url, now_iso())
+
+    def urls(self):
+        return self.index.cached_urls()
@@ -1,178 +1,368 @@
+import argparse
 import asyncio
 import logging
-import random
-import re
+import sqlite3
 from pathlib import Path
+from types import SimpleNamespace
 from playwright.async_api import async_playwright
-import trafilatura
 
 # Import from our new modules
 from config import (
-    URLS_FILE, OUTPUT_DIR, MIN_YEAR, MAX_PAGES_PER_SITE, 
-    MAX_CONCURRENT_PAGES, KEYWORDS, SKIP_PATTERNS
-)
-from utils import (
-    setup_logging, get_site_name, slugify, normalize_date, 
-    classify_content, load_processed_urls, save_processed_url, 
-    scan_existing_files
+    URLS_FILE, OUTPUT_DIR, LOG_FILE, USER_AGENT,
+    MAX_CONCURRENT_PAGES, MAX_PAGES_PER_DOMAIN, DOMAIN_DELAY,
+    EXTRACTION_WORKERS, EXTRACTION_QUEUE_SIZE, FEED_DISCOVERY, IN_PAGE_LINK_FILTER, MIN_YEAR,
+    WORKER_POLL_SECONDS, WORKER_CONCURRENT_DOMAINS, WORKER_QUEUE_RETRIES
 )
+from utils import setup_logging, get_domain, normalize_date, slugify
+from url_index import UrlIndex
+from scheduler import PagePool, DomainScheduler
+from resource_policy import ResourcePolicy
+from pipeline import ExtractionPipeline
+from fetcher import FetchTier
+from discovery import FeedDiscovery
+from readiness import ReadinessEngine
+from html_cache import HtmlCache
+from dedup import canonicalize_url
+from frontier import Frontier
+from metrics import metrics, Metrics
+from work_queue import WorkQueue
+from link_filter import LinkFilter, harvest_links
 
 # --- LOGGING ---
 logger = setup_logging("crawler")
 
-async def process_site(page, base_url, processed_urls):
+async def scroll_discover(crawl, base_url, link_filter):
+    """Fallback discovery for sources without feed: deep scroll the listing page and harvest the candidate links."""
+    async with crawl.scheduler.slot(base_url), crawl.pool.acquire() as page:
+        with metrics.span("goto", base_url):
+            await page.goto(base_url, timeout=60000, wait_until="domcontentloaded")
+        with metrics.span("ready_wait", base_url):
+            await crawl.readiness.wait_ready(page, base_url)
+
+        # Deep Scroll: keep scrolling while new links show up (up to 10 times)
+        with metrics.span("scroll", base_url):
+            await crawl.readiness.scroll_until_exhausted(page, base_url, max_scrolls=10)
+        crawl.readiness.log_savings(base_url)
+
+        # Filtered and deduplicated inside the page: only candidates come back
+        with metrics.span("harvest", base_url):
+            links, filtered = await harvest_links(page, link_filter, IN_PAGE_LINK_FILTER)
+        metrics.count("filtered", "url_rules", filtered)
+        return links
+
+def listing_entries(links, base_url):
+    """Discovery entries from harvested links; a <time datetime> next to the link drops old posts unvisited."""
+    entries, too_old = [], 0
+    for link in links:
+        date_iso = normalize_date(link["datetime"]) if link["datetime"] else None
+        if date_iso and int(date_iso[:4]) < MIN_YEAR:
+            too_old += 1
+            logger.debug(f"⏳ Skipped from listing ({date_iso}): {link['text'] or link['href']}")
+            continue
+        entries.append((link["href"], date_iso, date_iso is not None))
+    metrics.count("filtered", "listing_too_old", too_old)
+    logger.info(f"📅 {base_url}: {len(links)} links harvested, {sum(1 for e in entries if e[1])} dated on the listing, {too_old} older than {MIN_YEAR} skipped")
+    return entries
+
+async def discover_links(crawl, base_url):
+    """New candidates as [(url, date_iso, is_publication_date)] in listing order, from the source's
+    feed/sitemap when it has one (dates pre-filtered), else from the scrolled listing page."""
+    link_filter = LinkFilter(base_url)
+    entries = None
+    if crawl.feeds:
+        domain = get_domain(base_url)
+        with metrics.span("feed_discovery", base_url):
+            entries = await crawl.feeds.discover(base_url, lambda link: get_domain(link) == domain and link_filter.matches(link))
+    if entries is None:
+        entries = listing_entries(await scroll_discover(crawl, base_url, link_filter), base_url)
+
+    # Both sources are already filtered: only cross-variant duplicates and known URLs remain to drop
+    fresh, seen = [], set()
+    for link, date_iso, published in entries:
+        canonical = canonicalize_url(link)
+        if canonical in seen:
+            metrics.count("filtered", "url_variant")
+            continue
+        seen.add(canonical)
+        if link in crawl.processed_urls or canonical in crawl.processed_urls:
+            metrics.count("filtered", "already_known")
+            continue
+        fresh.append((link, date_iso, published))
+    return fresh
+
+async def process_site(crawl, base_url):
+    pipeline, frontier = crawl.pipeline, crawl.frontier
+    if frontier.is_finished(base_url):
+        logger.info(f"⏭️ Already finished in this run: {base_url}")
+        return
     logger.info(f"🕸️ Connecting to: {base_url}")
     try:
-        # Route blocking for performance (Images, Fonts, CSS)
-        await page.route("**/*", lambda route: route.abort() 
-            if route.request.resource_type in ["image", "media", "font", "stylesheet"] 
-            else route.continue_())
-
-        await page.goto(base_url, timeout=60000, wait_until="domcontentloaded")
-        await asyncio.sleep(3) 
-
-        # Deep Scroll: Aggressively trigger infinite scroll
-        previous_height = 0
-        for _ in range(10): # Try scrolling 10 times
-            await page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
-            await asyncio.sleep(1.5)
-            new_height = await page.evaluate("document.body.scrollHeight")
-            if new_height == previous_height:
-                break # Stop if no new content loaded
-            previous_height = new_height
-
-        # Get all links
-        links = await page.evaluate("""
-            () => Array.from(document.querySelectorAll('a')).map(a => a.href)
-        """)
-        
-        candidates = set()
-
-        for link in links:
-            if not link.startswith("http"): continue
-            
-            # 1. Skip if matches exclusion patterns
-            if any(p in link.lower() for p in SKIP_PATTERNS):
-                continue
-            
-            # 2. Skip "Year Archive" pages (e.g. /blog/2023 without article slug)
-            if re.search(r'/\d{4}/?$', link):
-                continue
-            
-            # 3. Skip Main Index Page (Base URL)
-            if link.rstrip("/") == base_url.rstrip("/"):
-                continue
-
-            if (base_url in link or any(k in link for k in KEYWORDS)) and link not in processed_urls:
-                 candidates.add(link)
-
-        logger.info(f"🔎 Found {len(candidates)} potential links on {base_url}")
-        
-        count = 0
-        for link in candidates:
-            if count >= MAX_PAGES_PER_SITE: break
-            if link in processed_urls: continue
-
-            await asyncio.sleep(random.uniform(1.5, 3)) # Slightly faster due to resource blocking
-            
-            try:
-                await page.goto(link, timeout=30000, wait_until="domcontentloaded")
-                html_content = await page.content()
-                
-                extracted = trafilatura.extract(html_content, output_format="markdown", include_tables=True)
-                metadata = trafilatura.extract_metadata(html_content)
-                
-                if not extracted or len(extracted) < 500:
-                    save_processed_url(link)
-                    processed_urls.add(link)
-                    continue
+        if not frontier.is_discovered(base_url):
+            frontier.add(base_url, await discover_links(crawl, base_url))
+        # Freshest first, so MAX_PAGES_PER_SITE keeps the newest articles; resumes where a killed run stopped
+        candidates = frontier.pending(base_url)
+        pipeline.saved[base_url] = max(pipeline.saved[base_url], frontier.saved(base_url))
+        logger.info(f"🔎 {len(candidates)} pending links on {base_url} ({pipeline.saved[base_url]} already saved this run)")
+
+        queue = iter(candidates)
 
-                date_iso = normalize_date(metadata.date if metadata else None)
-                if not date_iso:
-                    match = re.search(r'/(\d{4})/', link)
-                    if match: date_iso = f"{match.group(1)}-01-01"
-
-                # STRICT DATE CHECK
-                year_of_article = 0
-                if date_iso:
-                    year_of_article = int(date_iso.split('-')[0])
-                    if year_of_article < MIN_YEAR:
-                        logger.info(f"🕰️ Skipped (Too old: {year_of_article}): {link}")
-                        save_processed_url(link)
-                        processed_urls.add(link)
-                        continue
-                
-                category, subcategory = classify_content(extracted)
-                title = slugify(metadata.title if metadata and metadata.title else link.split("/")[-1])
-                
-                # Title Safety Net (Avoid Index Pages that slipped through URL filters)
-                if any(x in title for x in ["latest_news", "search_result", "index_of"]):
-                    logger.info(f"🗑️ Skipped (Title Noise): {title}")
-                    save_processed_url(link)
-                    processed_urls.add(link)
+        async def fetcher():
+            for link, date_iso, published in queue:
+                if not pipeline.has_budget(base_url): break
+                if not pipeline.claim(link): continue
+                if published: pipeline.hint_date(link, date_iso)
+                try:
+                    html_content, via = await crawl.tier.fetch(link)
+                except Exception as e:
+                    logger.error(f"Failed to process {link}: {e}")
+                    metrics.count("outcome", "fetch_error")
+                    continue  # Not journaled: the next crawl run (not a resume, the source is finished) retries it
+                if crawl.refresh and via == "cache":
+                    logger.info(f"♻️ Unchanged: {link}")
+                    metrics.count("outcome", "unchanged")
+                    frontier.done(link, "unchanged")
                     continue
+                # Blocks while the extractors are behind (backpressure on the fetchers)
+                await pipeline.submit(base_url, link, html_content, via)
 
-                site_name = get_site_name(link)
-                if date_iso:
-                    filename = f"{date_iso}_{site_name}_{title}.md"
-                    save_dir = OUTPUT_DIR / category / subcategory / str(year_of_article)
-                else:
-                    filename = f"Undated_{site_name}_{title}.md"
-                    save_dir = OUTPUT_DIR / category / subcategory / "Undated"
-
-                save_dir.mkdir(parents=True, exist_ok=True)
-                filepath = save_dir / filename
-                
-                with open(filepath, "w", encoding="utf-8") as f:
-                    f.write(f"--- SOURCE INFO ---\nURL: {link}\nDATE: {date_iso or 'Unknown'}\nCATEGORY: {category}/{subcategory}\n---\n\n{extracted}")
-                
-                logger.info(f"✅ Saved [{category}/{subcategory}]: {filename}")
-                save_processed_url(link)
-                processed_urls.add(link)
-                count += 1
-                
-            except Exception as e:
-                logger.error(f"Failed to process {link}: {e}")
+        # One fetcher per allowed domain slot; the scheduler enforces the actual limit
+        await asyncio.gather(*(fetcher() for _ in range(MAX_PAGES_PER_DOMAIN)))
+        logger.info(f"🏁 Done fetching {base_url}")
 
     except Exception as e:
         logger.error(f"Error crawling site {base_url}: {e}")
+    # Finished only once its pages left the extraction and writer queues: a kill before that resumes them
+    await pipeline.drain(base_url)
+    # Only a killed process leaves a source unfinished (a failing one must not pin the run forever)
+    frontier.finish(base_url)
 
-async def run_crawler():
+def load_sources():
+    with open(URLS_FILE, "r") as f:
+        return [l.strip() for l in f if l.strip() and not l.startswith("#")]
+
+def open_index(shared=False):
+    # Index loads in milliseconds; only folders whose mtime changed are rescanned
+    # Shared by worker processes: commit every write, and wait for the others' locks
+    index = UrlIndex(commit_every=1, timeout=60) if shared else UrlIndex()
+    index.import_log(LOG_FILE)
+    index.reconcile(OUTPUT_DIR)
+    return index
+
+async def open_crawl(p, index, refresh, run=None):
+    """Browser, page pool, fetch tier and extraction pipeline shared by every site this process crawls."""
+    processed_urls = set() if refresh else index.known_urls()
+    processed_urls.update({canonicalize_url(u) for u in processed_urls})
+
+    # Launch options for STEALTH configuration
+    browser = await p.chromium.launch(
+        headless=True,
+        args=["--disable-blink-features=AutomationControlled"] # Mask automation
+    )
+
+    # User Agent & Viewport
+    context = await browser.new_context(
+        user_agent=USER_AGENT,
+        viewport={"width": 1920, "height": 1080},
+        device_scale_factor=1
+    )
+
+    # Request blocking set up once for the whole context; shared page pool (anti-detection script per page)
+    policy = ResourcePolicy()
+    await policy.install(context)
+    pool = PagePool(context, MAX_CONCURRENT_PAGES, policy)
+    await pool.start()
+    scheduler = DomainScheduler(MAX_PAGES_PER_DOMAIN, DOMAIN_DELAY)
+    # Pooled HTTP first, browser only for JS-gated pages / domains learned as browser-only
+    readiness = ReadinessEngine(index.readiness_profiles())
+    tier = FetchTier(pool, scheduler, index.browser_only_domains(), readiness=readiness, cache=HtmlCache(index))
+    frontier = Frontier(index, run=run)
+    pipeline = ExtractionPipeline(index, processed_urls, EXTRACTION_WORKERS, EXTRACTION_QUEUE_SIZE, tier, frontier=frontier)
+    pipeline.start()
+    feeds = FeedDiscovery(tier.http, scheduler) if FEED_DISCOVERY and tier.http else None
+    return SimpleNamespace(
+        browser=browser, policy=policy, index=index,
+        pool=pool, scheduler=scheduler, readiness=readiness, tier=tier, feeds=feeds,
+        pipeline=pipeline, frontier=frontier, processed_urls=processed_urls, refresh=refresh
+    )
+
+async def close_crawl(crawl):
+    """Drains the pipeline (every queued article written), then persists what this process learned."""
+    await crawl.pipeline.close()
+    await crawl.pool.close()
+    await crawl.tier.close()
+    crawl.index.update_domain_stats(crawl.tier.stats, crawl.tier.needs_browser)
+    crawl.index.save_readiness_profiles(crawl.readiness.profiles)
+    logger.info(f"⏱️ Event-driven waits saved {crawl.readiness.total_saved():.1f}s vs fixed sleeps")
+    logger.info(crawl.policy.summary())
+    for site, saved in crawl.pipeline.saved.items():
+        logger.info(f"📊 {site}: {saved} saved")
+    await crawl.browser.close()
+
+async def run_crawler(refresh=False):
+    """refresh: revalidate already-processed articles too (conditional requests, rewrite only what changed)."""
     OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
-    processed_urls = load_processed_urls()
-    processed_urls.update(scan_existing_files(OUTPUT_DIR))
     
     if not URLS_FILE.exists():
         logger.error("urls.txt not found")
         return
 
-    with open(URLS_FILE, "r") as f:
-        urls = [l.strip() for l in f if l.strip() and not l.startswith("#")]
+    urls = load_sources()
+    index = open_index()
 
     async with async_playwright() as p:
-        # Launch options for STEALTH configuration
-        browser = await p.chromium.launch(
-            headless=True,
-            args=["--disable-blink-features=AutomationControlled"] # Mask automation
-        )
-        
-        # User Agent & Viewport
-        context = await browser.new_context(
-            user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36",
-            viewport={"width": 1920, "height": 1080},
-            device_scale_factor=1
-        )
-        
-        # Anti-detection script injection
-        page = await context.new_page()
-        await page.add_init_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
-
-        for base_url in urls:
-            await process_site(page, base_url, processed_urls)
-            logger.info("💤 Cooling down between sites...")
-            await asyncio.sleep(5)
-
-        await browser.close()
+        crawl = await open_crawl(p, index, refresh)
+        # All sites run in parallel (heaviest SOURCE_WEIGHTS first); the pool caps open pages,
+        # the scheduler keeps each domain polite
+        await asyncio.gather(*(process_site(crawl, base_url) for base_url in crawl.frontier.order(urls)))
+        await close_crawl(crawl)
+        crawl.frontier.finish_run(urls)
+
+    index.close()
+    metrics.write_report("crawl")
+
+# --- WORKER MODE ---
+async def queue_call(fn, *args, **kwargs):
+    """A work queue operation, retried while the shared file is locked (WORKER_QUEUE_RETRIES times)."""
+    for attempt in range(1, WORKER_QUEUE_RETRIES + 1):
+        try:
+            return fn(*args, **kwargs)
+        except sqlite3.OperationalError as e:
+            if attempt == WORKER_QUEUE_RETRIES:
+                raise
+            logger.warning(f"⚠️ Work queue busy ({fn.__name__}: {e}), retry {attempt}/{WORKER_QUEUE_RETRIES}")
+            await asyncio.sleep(min(2 ** attempt, 30))
+
+async def crawl_lease(crawl, queue, domain, sites):
+    """Crawls every source of a leased domain, then marks the lease done."""
+    crawl.frontier.reload()  # A crashed worker may have discovered (or finished) some of them already
+    crawl.pipeline.resume(sites)  # Leased again after losing it earlier in this process
+    await asyncio.gather(*(process_site(crawl, site) for site in sites))
+    await queue_call(queue.complete, domain, sum(crawl.pipeline.saved[site] for site in sites))
+    await queue_call(queue.log_progress)
+
+async def lease_loop(crawl, queue, held):
+    """Takes domain leases until the shared run is complete; idles while others still hold the last ones."""
+    while True:
+        lease = await queue_call(queue.claim)
+        if lease is None:
+            if await queue_call(queue.is_complete):
+                return
+            await asyncio.sleep(WORKER_POLL_SECONDS)  # A lease may still expire (crashed worker)
+            continue
+        domain, sites = lease
+        logger.info(f"🔒 Leased {domain} ({len(sites)} sources)")
+        held[domain] = task = asyncio.create_task(crawl_lease(crawl, queue, domain, sites))
+        try:
+            # Not `await task`: a lost lease cancels the task, a shutdown cancels this loop, and the two stay apart
+            await asyncio.wait({task})
+        except asyncio.CancelledError:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            await queue_call(queue.release, domain)  # Stopped on purpose: hand the domain back without burning an attempt
+            raise
+        finally:
+            held.pop(domain, None)
+        if domain in crawl.lost_leases:
+            crawl.lost_leases.discard(domain)
+            crawl.pipeline.drop(sites)  # Its queued pages belong to the new holder now
+            logger.warning(f"⚠️ Lease on {domain} lost (taken over by another worker): stopped")
+        else:
+            task.result()  # A crawl error still ends the worker
+
+async def keep_leases(crawl, queue, held):
+    """Renews the held leases (every third of their lifetime) and publishes this worker's progress."""
+    while True:
+        await asyncio.sleep(queue.lease_seconds / 3)
+        try:
+            for domain in queue.renew(list(held)):
+                # Expired and taken over: stop at once, two workers on one domain would break politeness
+                crawl.lost_leases.add(domain)
+                held[domain].cancel()
+            queue.heartbeat(sum(crawl.pipeline.saved.values()), metrics.to_dict("crawl"))
+        except sqlite3.OperationalError as e:
+            # Queue busy or its mount hiccuped: retried next tick, well before the leases expire
+            logger.warning(f"⚠️ Lease renewal failed ({e}): retrying in {queue.lease_seconds / 3:.0f}s")
+
+async def run_worker(worker=None, refresh=False):
+    """One of several crawler processes sharing the work queue (this host or others); see work_queue.py."""
+    OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+    if not URLS_FILE.exists():
+        logger.error("urls.txt not found")
+        return
+
+    queue = WorkQueue(worker=worker)
+    run = queue.seed(load_sources())
+    logger.info(f"👷 Worker {queue.worker} joined run {run}")
+    index = open_index(shared=True)
+    held = {}
+
+    async with async_playwright() as p:
+        crawl = await open_crawl(p, index, refresh, run=run)
+        crawl.lost_leases = set()
+        heartbeat = asyncio.create_task(keep_leases(crawl, queue, held))
+        loops = [asyncio.create_task(lease_loop(crawl, queue, held)) for _ in range(WORKER_CONCURRENT_DOMAINS)]
+        try:
+            await asyncio.gather(*loops)
+        finally:
+            # One loop failing (or an interrupt) stops the others before the browser closes under them;
+            # each hands its domain back as it stops
+            for loop in loops:
+                loop.cancel()
+            await asyncio.gather(*loops, return_exceptions=True)
+            heartbeat.cancel()
+            await close_crawl(crawl)
+            await queue_call(queue.heartbeat, sum(crawl.pipeline.saved.values()), metrics.to_dict("crawl"), finished=True)
+
+    metrics.write_report(f"crawl_{slugify(queue.worker)}")
+    if await queue_call(queue.is_complete):
+        # Every worker closes the run in its own index (hosts may not share one): the next start rediscovers
+        index.finish_crawl_run(run)
+        # This worker's final report is posted above: the merge waits for every other one too
+        if await queue_call(queue.finish_run):
+            # Last worker out: the run's combined report, as if one process had crawled everything
+            combined = Metrics()
+            for report in queue.reports():
+                combined.merge(report)
+            combined.write_report("crawl")
+            logger.info(f"🏁 Run {run} complete")
+    queue.log_progress()
+    queue.close()
+    index.close()
+
+async def reextract_from_cache():
+    """Rebuilds the Markdown corpus from the raw HTML cache: no browser, no network."""
+    OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+    index = open_index()
+    cache = HtmlCache(index)
+    pipeline = ExtractionPipeline(index, set(), EXTRACTION_WORKERS, EXTRACTION_QUEUE_SIZE, budget=None)
+    pipeline.start()
+
+    urls = cache.urls()
+    logger.info(f"📦 Re-extracting {len(urls)} cached pages...")
+    for url in urls:
+        html_content = cache.load(url)
+        if html_content is None:
+            logger.error(f"Missing cache blob for {url}")
+            continue
+        await pipeline.submit(get_domain(url), url, html_content, "cache")
+
+    await pipeline.close()
+    logger.info(f"📊 {sum(pipeline.saved.values())} articles rewritten from cache")
+    index.close()
+    metrics.write_report("reextract")
 
 if __name__ == "__main__":
-    asyncio.run(run_crawler())
+    parser = argparse.ArgumentParser(description="Crawl the sources of urls.txt into the NotebookLM corpus.")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--refresh", action="store_true", help="Revalidate already-processed articles (conditional requests)")
+    mode.add_argument("--reextract", action="store_true", help="Rebuild the Markdown corpus offline from the HTML cache")
+    parser.add_argument("--worker", action="store_true", help="Worker mode: take domain leases from the shared work queue (run several)")
+    parser.add_argument("--worker-id", help="Stable worker name (default: host-pid); keeps the same domains on the same worker")
+    args = parser.parse_args()
+
+    if args.reextract:
+        asyncio.run(reextract_from_cache())
+    elif args.worker or args.worker_id:
+        asyncio.run(run_worker(args.worker_id, refresh=args.refresh))
+    else:
+        asyncio.run(run_crawler(refresh=args.refresh))
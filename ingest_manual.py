@@ -1,97 +1,252 @@
+import argparse
 import asyncio
-import logging
-import re
+import json
+import os
+import sqlite3
 import sys
-import trafilatura
+from concurrent.futures import ProcessPoolExecutor
 from playwright.async_api import async_playwright
 
 # Import from our new modules
-from config import OUTPUT_DIR
-from utils import (
-    setup_logging, get_site_name, slugify, normalize_date, 
-    classify_content
+from config import (
+    USER_AGENT, MAX_PAGES_PER_DOMAIN, DOMAIN_DELAY, EXTRACTION_WORKERS,
+    MANUAL_CONCURRENCY, MANUAL_DAEMON_PORT, MANUAL_INDEX_RETRIES
 )
+from utils import setup_logging
+from extraction import format_timings
+from pipeline import extract_page, save_article
+from dedup import remember, canonicalize_url
+from scheduler import PagePool, DomainScheduler
+from resource_policy import ResourcePolicy
+from readiness import ReadinessEngine
+from url_index import UrlIndex
+from metrics import metrics
 
 # --- LOGGING ---
 logger = setup_logging("manual_ingest")
 
+
 # --- CORE LOGIC ---
-async def process_single_url(url):
-    logger.info(f"🎯 Sniper activé sur : {url}")
-    
-    async with async_playwright() as p:
-        # Launch stealth browser
-        browser = await p.chromium.launch(headless=True, args=["--disable-blink-features=AutomationControlled"])
-        context = await browser.new_context(
-            user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36",
+class ManualIngestor:
+    """Warm Chromium shared by every manual import.
+
+    The browser, context and page pool are started once; each URL then costs
+    a navigation, not a cold start. Extraction, classification and saving
+    are the auto crawler's (extract_page in non-strict mode, save_article),
+    and imports are recorded in the URL index so the crawler skips them.
+    """
+
+    def __init__(self, concurrency=MANUAL_CONCURRENCY):
+        self.concurrency = concurrency
+        self.index = UrlIndex(commit_every=1, timeout=30)  # May run next to a crawler: short write locks, patient waits
+        self.readiness = ReadinessEngine(self.index.readiness_profiles())
+        self.scheduler = DomainScheduler(MAX_PAGES_PER_DOMAIN, DOMAIN_DELAY)
+        self.executor = ProcessPoolExecutor(max_workers=EXTRACTION_WORKERS or min(concurrency, os.cpu_count() or 1))
+
+    async def start(self):
+        self.playwright = await async_playwright().start()
+        self.browser = await self.playwright.chromium.launch(
+            headless=True, args=["--disable-blink-features=AutomationControlled"]
+        )
+        self.context = await self.browser.new_context(
+            user_agent=USER_AGENT,
             viewport={"width": 1920, "height": 1080}
         )
-        page = await context.new_page()
-        await page.add_init_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
-
+        self.policy = ResourcePolicy()
+        await self.policy.install(self.context)
+        self.pool = PagePool(self.context, self.concurrency, self.policy)
+        await self.pool.start()
+        logger.info(f"🔥 Navigateur prêt ({self.concurrency} pages)")
+
+    async def _render(self, url):
+        async with self.scheduler.slot(url), self.pool.acquire() as page:
+            with metrics.span("goto", url):
+                await page.goto(url, timeout=60000, wait_until="domcontentloaded")
+            with metrics.span("ready_wait", url):
+                await self.readiness.wait_ready(page, url, baseline=2)  # Wait for hydration
+            # Scroll once just in case (returns as soon as new content shows up)
+            with metrics.span("scroll", url):
+                await self.readiness.scroll_until_exhausted(page, url, max_scrolls=1, baseline_per_scroll=1)
+            with metrics.span("content", url):
+                return await page.content()
+
+    async def ingest(self, url):
+        """Imports one URL; returns {"url", "status", "path"} (or "error").
+
+        Saved under the canonical URL (no www., tracking parameters...), the
+        form the crawler checks before fetching an article.
+        """
+        logger.info(f"🎯 Sniper activé sur : {url}")
+        canonical = canonicalize_url(url)
         try:
-            # Resource Blocking
-            await page.route("**/*", lambda route: route.abort() 
-                if route.request.resource_type in ["image", "media", "font", "stylesheet"] 
-                else route.continue_())
-
-            logger.info("⏳ Chargement de la page...")
-            await page.goto(url, timeout=60000, wait_until="domcontentloaded")
-            await asyncio.sleep(2) # Wait for hydration
-
-            # Scroll once just in case
-            await page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
-            await asyncio.sleep(1)
-
-            html_content = await page.content()
-            
-            # Extraction
-            extracted = trafilatura.extract(html_content, output_format="markdown", include_tables=True)
-            metadata = trafilatura.extract_metadata(html_content)
-
-            if not extracted:
-                logger.error("❌ Échec : Impossible d'extraire du contenu texte pertinent.")
+            html_content = await self._render(url)
+            loop = asyncio.get_running_loop()
+            with metrics.span("extract_worker", url):
+                result = await loop.run_in_executor(self.executor, extract_page, canonical, html_content, None, False)
+            metrics.observe_timings(result["timings"], url)
+            metrics.count("outcome", result["status"] if result["status"] != "ok" else "saved")
+            if result["status"] != "ok":
+                # Not journaled: a failed manual import must not stop the crawler from trying the page
+                logger.error(f"❌ Échec : Impossible d'extraire du contenu texte pertinent ({url})")
+                return {"url": url, "status": result["status"], "path": None}
+
+            previous = self.index.path_for(canonical) or self.index.path_for(url)
+            with metrics.span("write"):
+                filepath = await asyncio.to_thread(save_article, result)
+            if previous and previous != str(filepath) and os.path.exists(previous):
+                os.remove(previous)
+        except Exception as e:
+            logger.error(f"❌ Erreur critique ({url}) : {e}")
+            metrics.count("outcome", "error")
+            return {"url": url, "status": "error", "error": str(e)}
+
+        logger.info(f"✅ SUCCÈS [{result['category']}/{result['subcategory']}] ({format_timings(result['timings'])})")
+        logger.info(f"📂 Chemin : {filepath}")
+        await self._journal(canonical, filepath, result)
+        return {"url": url, "status": "saved", "path": str(filepath)}
+
+    async def _journal(self, url, filepath, result):
+        """Records an import in the index, retrying while a running crawler holds the write lock.
+
+        Never fails the import: the file is already written, and if the index
+        stays busy the crawler's next reconcile picks it up from disk.
+        """
+        for attempt in range(1, MANUAL_INDEX_RETRIES + 1):
+            try:
+                self.index.record(url, "saved", filepath, result["date"],
+                                  f"{result['category']}/{result['subcategory']}", result["content"])
+                if result["simhash"] is not None:
+                    remember(self.index, url, result["simhash"])
+                self.index.commit()
                 return
+            except sqlite3.OperationalError as e:
+                self.index.conn.rollback()
+                logger.warning(f"⏳ Index occupé ({e}), essai {attempt}/{MANUAL_INDEX_RETRIES} : {url}")
+                await asyncio.sleep(attempt)
+        logger.error(f"❌ Index non mis à jour pour {url} (fichier sauvegardé, repris au prochain reconcile)")
+
+    async def ingest_many(self, urls):
+        # The page pool caps concurrency, the scheduler keeps each domain polite
+        return await asyncio.gather(*(self.ingest(url) for url in dict.fromkeys(urls)))
+
+    async def close(self):
+        self.index.save_readiness_profiles(self.readiness.profiles)
+        logger.info(self.policy.summary())
+        await self.pool.close()
+        await self.browser.close()
+        await self.playwright.stop()
+        self.executor.shutdown()
+        self.index.close()
+        metrics.write_report("manual")
+
+
+# --- DAEMON (localhost only) ---
+async def handle_request(ingestor, reader, writer):
+    """Minimal HTTP/1.1: POST /ingest with a JSON {"urls": [...]} body (Content-Type: application/json).
+
+    Requests carrying an Origin header, or any other content type, are
+    refused: a web page open in the user's browser can send a simple
+    cross-origin POST to 127.0.0.1, but never without one or the other.
+    """
+    try:
+        request_line = (await reader.readline()).decode("latin-1").split()
+        headers = {}
+        while True:
+            line = (await reader.readline()).decode("latin-1").strip()
+            if not line: break
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+        body = await reader.readexactly(int(headers.get("content-length", 0)))
+
+        if len(request_line) < 2:
+            status, payload = "400 Bad Request", {"error": "malformed request"}
+        elif request_line[:2] == ["GET", "/health"]:
+            status, payload = "200 OK", {"status": "ok"}
+        elif "origin" in headers:
+            status, payload = "403 Forbidden", {"error": "browser requests are not accepted"}
+        elif request_line[:2] == ["POST", "/ingest"] and headers.get("content-type", "").split(";")[0].strip().lower() != "application/json":
+            status, payload = "415 Unsupported Media Type", {"error": "send a JSON body with Content-Type: application/json"}
+        elif request_line[:2] == ["POST", "/ingest"]:
+            urls = parse_urls(body.decode("utf-8", "ignore"))
+            if not urls:
+                raise ValueError("no URL in the request body")
+            status, payload = "200 OK", await ingestor.ingest_many(urls)
+        else:
+            status, payload = "404 Not Found", {"error": "use POST /ingest"}
+    except (asyncio.IncompleteReadError, ValueError) as e:
+        status, payload = "400 Bad Request", {"error": str(e)}
+    except Exception as e:
+        # The client always gets an answer, even for a bug: a dropped connection looks like a hang
+        logger.error(f"❌ Requête en échec : {e}")
+        status, payload = "500 Internal Server Error", {"error": str(e)}
+
+    data = json.dumps(payload, ensure_ascii=False, indent=2).encode("utf-8")
+    writer.write(
+        f"HTTP/1.1 {status}\r\nContent-Type: application/json; charset=utf-8\r\n"
+        f"Content-Length: {len(data)}\r\nConnection: close\r\n\r\n".encode("latin-1") + data
+    )
+    await writer.drain()
+    writer.close()
+
+
+def parse_urls(text):
+    """URLs from a JSON {"urls": [...]} document or one URL per line; ValueError for any other JSON."""
+    text = text.strip()
+    if text.startswith(("{", "[")):
+        data = json.loads(text)
+        urls = data.get("urls") if isinstance(data, dict) else None
+        if not isinstance(urls, list) or not all(isinstance(u, str) for u in urls):
+            raise ValueError('expected a JSON object {"urls": ["https://...", ...]}')
+        return [u.strip() for u in urls if u.strip()]
+    return [line.strip() for line in text.splitlines() if line.strip().startswith("http")]
+
+
+async def serve(port=MANUAL_DAEMON_PORT):
+    ingestor = ManualIngestor()
+    await ingestor.start()
+    server = await asyncio.start_server(lambda r, w: handle_request(ingestor, r, w), "127.0.0.1", port)
+    logger.info(f"📡 Daemon à l'écoute sur http://127.0.0.1:{port}/ingest")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await ingestor.close()
+
+
+async def run_batch(urls):
+    ingestor = ManualIngestor()
+    await ingestor.start()
+    try:
+        results = await ingestor.ingest_many(urls)
+    finally:
+        await ingestor.close()
+    saved = [r for r in results if r["status"] == "saved"]
+    logger.info(f"📊 {len(saved)}/{len(results)} URLs importées")
+    for r in results:
+        print(f"{r['url']}\t{r.get('path') or r['status']}")
+    return results
 
-            date_iso = normalize_date(metadata.date if metadata else None)
-            if not date_iso:
-                 # Try URL date pattern
-                 match = re.search(r'/(\d{4})/', url)
-                 if match: date_iso = f"{match.group(1)}-01-01"
-
-            # Classification
-            category, subcategory = classify_content(extracted)
-            title = slugify(metadata.title if metadata and metadata.title else url.split("/")[-1])
-            site_name = get_site_name(url)
-
-            # Save Logic
-            if date_iso:
-                year = date_iso.split('-')[0]
-                filename = f"{date_iso}_{site_name}_{title}.md"
-                save_dir = OUTPUT_DIR / category / subcategory / year
-            else:
-                filename = f"Undated_{site_name}_{title}.md"
-                save_dir = OUTPUT_DIR / category / subcategory / "Undated"
-
-            save_dir.mkdir(parents=True, exist_ok=True)
-            filepath = save_dir / filename
-
-            with open(filepath, "w", encoding="utf-8") as f:
-                f.write(f"--- SOURCE INFO ---\nURL: {url}\nDATE: {date_iso or 'Unknown'}\nCATEGORY: {category}/{subcategory}\n---\n\n{extracted}")
-
-            logger.info(f"✅ SUCCÈS : Fichier créé !")
-            logger.info(f"📂 Chemin : {filepath}")
-
-        except Exception as e:
-            logger.error(f"❌ Erreur critique : {e}")
-        finally:
-            await browser.close()
 
 if __name__ == "__main__":
-    if len(sys.argv) > 1:
-        target_url = sys.argv[1]
-    else:
+    parser = argparse.ArgumentParser(description="Manual (\"sniper\") import of specific URLs.")
+    parser.add_argument("urls", nargs="*", help="URLs to import")
+    parser.add_argument("--file", help="File with one URL per line ('-' for stdin)")
+    parser.add_argument("--serve", action="store_true", help="Run a localhost daemon with a warm browser")
+    parser.add_argument("--port", type=int, default=MANUAL_DAEMON_PORT)
+    args = parser.parse_args()
+
+    if args.serve:
+        asyncio.run(serve(args.port))
+        sys.exit(0)
+
+    targets = list(args.urls)
+    if args.file:
+        source = sys.stdin if args.file == "-" else open(args.file, "r", encoding="utf-8")
+        with source:
+            targets += parse_urls(source.read())
+    if not targets:
         target_url = input("🔗 Entrez l'URL à aspirer : ").strip()
-    
-    if target_url:
-        asyncio.run(process_single_url(target_url))
+        if target_url: targets = [target_url]
+
+    if targets:
+        asyncio.run(run_batch(targets))
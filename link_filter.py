@@ -0,0 +1,79 @@
+import re
+
+from config import SKIP_PATTERNS, KEYWORDS
+
+# Compiled once: one regex pass per link instead of a lowercase + substring scan per pattern
+SKIP_RE = re.compile("|".join(re.escape(p) for p in SKIP_PATTERNS), re.IGNORECASE)
+KEYWORD_RE = re.compile("|".join(re.escape(k) for k in KEYWORDS))
+YEAR_ARCHIVE_RE = re.compile(r"/\d{4}/?$")  # e.g. /blog/2023 without article slug
+
+# Runs in the page: walks document.links once and returns deduplicated
+# {href, text, datetime} records. With rules, the same filter as
+# LinkFilter.matches is applied first, so only candidates cross the CDP boundary.
+# datetime comes from the closest ancestor holding exactly one <time datetime>
+# (a post card), never from a container listing several posts.
+HARVEST_LINKS_JS = r"""
+(rules) => {
+    const esc = s => s.replace(/[.*+?^${}()|[\]\\]/g, '\\$&');
+    const skip = rules && new RegExp(rules.skip.map(esc).join('|'), 'i');
+    const keywords = rules && new RegExp(rules.keywords.map(esc).join('|'));
+    const yearArchive = /\/\d{4}\/?$/;
+    const base = rules && rules.base.replace(/\/+$/, '');
+    const keep = href => !rules || (
+        href.startsWith('http') && !skip.test(href) && !yearArchive.test(href) &&
+        href.replace(/\/+$/, '') !== base && (href.includes(rules.base) || keywords.test(href))
+    );
+    const nearbyTime = a => {
+        for (let node = a, depth = 0; node && depth < 5; node = node.parentElement, depth++) {
+            const times = node.querySelectorAll('time[datetime]');
+            if (times.length === 1) return times[0].getAttribute('datetime');
+            if (times.length > 1) return null;
+        }
+        return null;
+    };
+    const found = new Map(), seen = new Set();
+    for (const a of document.links) {
+        const href = a.href.split('#')[0];
+        seen.add(href);
+        const text = (a.textContent || '').trim().replace(/\s+/g, ' ').slice(0, 200);
+        const known = found.get(href);
+        if (known) {
+            if (!known.text) known.text = text;
+            continue;
+        }
+        if (!keep(href)) continue;
+        found.set(href, {href, text, datetime: nearbyTime(a)});
+    }
+    return {links: Array.from(found.values()), seen: seen.size};
+}
+"""
+
+
+class LinkFilter:
+    """Candidate-article test for one source, built from SKIP_PATTERNS and KEYWORDS."""
+
+    def __init__(self, base_url):
+        self.base_url = base_url
+        self._base = base_url.rstrip("/")
+
+    def matches(self, link):
+        if not link.startswith("http"): return False
+        if SKIP_RE.search(link) or YEAR_ARCHIVE_RE.search(link): return False
+        if link.rstrip("/") == self._base: return False  # Main index page
+        return self.base_url in link or KEYWORD_RE.search(link) is not None
+
+    def js_rules(self):
+        return {"skip": SKIP_PATTERNS, "keywords": KEYWORDS, "base": self.base_url}
+
+
+async def harvest_links(page, link_filter, in_page=True):
+    """([{href, text, datetime}] of the candidate links on the page, number of distinct links filtered out).
+
+    in_page=False ships every link back and filters in Python (same result,
+    more CDP traffic): kept for debugging the in-page filter.
+    """
+    harvested = await page.evaluate(HARVEST_LINKS_JS, link_filter.js_rules() if in_page else None)
+    links = harvested["links"]
+    if not in_page:
+        links = [link for link in links if link_filter.matches(link["href"])]
+    return links, harvested["seen"] - len(links)
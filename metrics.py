@@ -0,0 +1,183 @@
+import json
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+
+from config import METRICS_DIR
+from utils import setup_logging, get_domain
+
+logger = setup_logging("metrics")
+
+BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)  # Seconds (Prometheus "le" bounds)
+
+
+class Histogram:
+    __slots__ = ("counts", "sum", "count", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect_left(BUCKETS, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+        self.max = max(self.max, seconds)
+
+    @classmethod
+    def from_dict(cls, data):
+        h = cls()
+        cumulative = list(data["buckets"].values())
+        h.counts = [total - previous for previous, total in zip([0] + cumulative, cumulative)]
+        h.sum, h.count, h.max = data["sum"], data["count"], data["max"]
+        return h
+
+    def merge(self, other):
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.sum += other.sum
+        self.count += other.count
+        self.max = max(self.max, other.max)
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-quantile (the max for the +Inf bucket)."""
+        rank, seen = q * self.count, 0
+        for bound, n in zip(BUCKETS, self.counts):
+            seen += n
+            if seen >= rank: return round(min(bound, self.max), 3)
+        return round(self.max, 3)
+
+    def cumulative(self):
+        total, out = 0, []
+        for n in self.counts:
+            total += n
+            out.append(total)
+        return out
+
+    def to_dict(self):
+        return {
+            "count": self.count, "sum": round(self.sum, 3), "max": round(self.max, 3),
+            "p50": self.quantile(0.5), "p95": self.quantile(0.95),
+            "buckets": dict(zip([str(b) for b in BUCKETS] + ["+Inf"], self.cumulative())),
+        }
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Metrics:
+    """In-process run telemetry: stage spans, per-domain latency histograms and event counters.
+
+    Thread-safe (the file writer records from its threads). Worker processes
+    do not record anything themselves: they return their timings, which the
+    pipeline feeds back through `observe_timings`.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.stages = defaultdict(Histogram)  # stage -> Histogram
+        self.domains = defaultdict(Histogram)  # (domain, stage) -> Histogram
+        self.counters = Counter()  # (name, label) -> count
+
+    def observe(self, stage, seconds, url=None):
+        with self.lock:
+            self.stages[stage].observe(seconds)
+            if url:
+                self.domains[(get_domain(url), stage)].observe(seconds)
+
+    @contextmanager
+    def span(self, stage, url=None):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start, url)
+
+    def observe_timings(self, timings, url=None):
+        """Worker timings ({'parse_ms': 12.3, ...}) as stages 'parse', 'extract', ..."""
+        for key, ms in timings.items():
+            self.observe(key[:-3], ms / 1000, url)
+
+    def count(self, name, label="", n=1):
+        if n:
+            with self.lock:
+                self.counters[(name, label)] += n
+
+    def merge(self, report):
+        """Adds another process's to_dict() report (worker mode: the whole run as one crawl)."""
+        with self.lock:
+            self.started = min(self.started, datetime.fromisoformat(report["started"]).timestamp())
+            for stage, h in report["stages"].items():
+                self.stages[stage].merge(Histogram.from_dict(h))
+            for domain, stages in report["domains"].items():
+                for stage, h in stages.items():
+                    self.domains[(domain, stage)].merge(Histogram.from_dict(h))
+            for key, value in report["counters"].items():
+                name, _, label = key.partition(":")
+                self.counters[(name, label)] += value
+
+    def to_dict(self, name):
+        with self.lock:
+            return {
+                "run": name,
+                "started": datetime.fromtimestamp(self.started).isoformat(timespec="seconds"),
+                "duration_s": round(time.time() - self.started, 1),
+                "stages": {stage: h.to_dict() for stage, h in sorted(self.stages.items())},
+                "domains": {
+                    domain: {stage: h.to_dict() for (d, stage), h in sorted(self.domains.items()) if d == domain}
+                    for domain in sorted({d for d, _ in self.domains})
+                },
+                "counters": {f"{n}:{l}" if l else n: v for (n, l), v in sorted(self.counters.items())},
+            }
+
+    def to_prometheus(self, name):
+        """Prometheus textfile-collector format."""
+        lines = [
+            "# TYPE notebooklm_run_duration_seconds gauge",
+            f'notebooklm_run_duration_seconds{{run="{name}"}} {time.time() - self.started:.1f}',
+            "# TYPE notebooklm_run_timestamp_seconds gauge",
+            f'notebooklm_run_timestamp_seconds{{run="{name}"}} {self.started:.0f}',
+        ]
+        with self.lock:
+            for metric, series in (
+                ("notebooklm_stage_seconds", {(("stage", s),): h for s, h in self.stages.items()}),
+                ("notebooklm_domain_stage_seconds", {(("domain", d), ("stage", s)): h for (d, s), h in self.domains.items()}),
+            ):
+                lines.append(f"# TYPE {metric} histogram")
+                for labels, h in sorted(series.items()):
+                    base = ",".join(f'{k}="{_label(v)}"' for k, v in (("run", name),) + labels)
+                    for bound, total in zip([str(b) for b in BUCKETS] + ["+Inf"], h.cumulative()):
+                        lines.append(f'{metric}_bucket{{{base},le="{bound}"}} {total}')
+                    lines.append(f"{metric}_sum{{{base}}} {h.sum:.6f}")
+                    lines.append(f"{metric}_count{{{base}}} {h.count}")
+            lines.append("# TYPE notebooklm_events_total counter")
+            for (n, l), v in sorted(self.counters.items()):
+                lines.append(f'notebooklm_events_total{{run="{name}",event="{_label(n)}",label="{_label(l)}"}} {v}')
+        return "\n".join(lines) + "\n"
+
+    def write_report(self, name, directory=METRICS_DIR):
+        """Writes reports/<name>_<timestamp>.json (history) and reports/<name>.prom (latest, for node_exporter)."""
+        directory.mkdir(parents=True, exist_ok=True)
+        stamp = datetime.fromtimestamp(self.started).strftime("%Y%m%d_%H%M%S")
+        report = self.to_dict(name)
+        json_path = directory / f"{name}_{stamp}.json"
+        json_path.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+        prom_path = directory / f"{name}.prom"
+        tmp = prom_path.with_name(prom_path.name + ".tmp")
+        tmp.write_text(self.to_prometheus(name), encoding="utf-8")
+        tmp.replace(prom_path)
+
+        top = sorted(report["stages"].items(), key=lambda item: -item[1]["sum"])[:5]
+        logger.info("📈 Time by stage: " + ", ".join(f"{stage} {h['sum']:.1f}s (p95 {h['p95']}s)" for stage, h in top))
+        logger.info(f"📈 Report written to {json_path}")
+        return json_path
+
+
+# One collector per process, like the loggers
+metrics = Metrics()
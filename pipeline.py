@@ -0,0 +1,300 @@
+import asyncio
+import os
+import time
+from collections import Counter
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor
+
+from config import OUTPUT_DIR, MIN_YEAR, MAX_PAGES_PER_SITE, MIN_CONTENT_LENGTH, NEAR_DUPLICATE_CHECK, SIMHASH_MAX_DISTANCE
+from extraction import extract_document, format_timings
+from dedup import canonicalize_url, simhash, find_near_duplicate, remember, hamming
+from writer import ArticleWriter, write_atomic
+from metrics import metrics
+from utils import (
+    setup_logging, get_site_name, slugify, normalize_date, date_from_url,
+    classify_content, format_article
+)
+
+logger = setup_logging("pipeline")
+
+TITLE_NOISE = ["latest_news", "search_result", "index_of"]
+
+
+# --- EXTRACTION STAGE (runs in worker processes) ---
+def extract_page(url, html_content, date_hint=None, strict=True):
+    """All the CPU-bound work for one article. Must stay a top-level function (pickled).
+
+    date_hint (feed pubDate/lastmod) is used when the page itself has no date.
+    strict=False (manual imports) keeps any non-empty page: no length, date or title filter.
+    """
+    doc = extract_document(html_content, url, min_length=MIN_CONTENT_LENGTH if strict else 1)
+    extracted, metadata, timings = doc["content"], doc["metadata"], doc["timings"]
+
+    if not extracted or (strict and len(extracted) < MIN_CONTENT_LENGTH):
+        return {"url": url, "status": "too_short", "timings": timings}
+
+    date_iso = normalize_date(metadata.date if metadata else None) or date_hint or date_from_url(url)
+
+    # STRICT DATE CHECK
+    year = int(date_iso.split('-')[0]) if date_iso else 0
+    if strict and date_iso and year < MIN_YEAR:
+        return {"url": url, "status": "too_old", "year": year, "timings": timings}
+
+    start = time.perf_counter()
+    category, subcategory = classify_content(extracted)
+    timings["classify_ms"] = round((time.perf_counter() - start) * 1000, 1)
+    title = slugify(metadata.title if metadata and metadata.title else url.split("/")[-1])
+
+    # Title Safety Net (Avoid Index Pages that slipped through URL filters)
+    if strict and any(x in title for x in TITLE_NOISE):
+        return {"url": url, "status": "title_noise", "title": title, "timings": timings}
+
+    return {
+        "url": url, "status": "ok", "date": date_iso, "year": year,
+        "category": category, "subcategory": subcategory,
+        "title": title, "content": extracted, "timings": timings,
+        "simhash": simhash(extracted),
+    }
+
+
+# --- WRITER STAGE ---
+def article_path(result, output_dir=OUTPUT_DIR):
+    """Category/Subcategory/Year/<date>_<site>_<title>.md for an extracted article."""
+    site_name = get_site_name(result["url"])
+    save_dir = output_dir / result["category"] / result["subcategory"]
+    if result["date"]:
+        return save_dir / str(result["year"]) / f"{result['date']}_{site_name}_{result['title']}.md"
+    return save_dir / "Undated" / f"Undated_{site_name}_{result['title']}.md"
+
+
+def render_article(result):
+    return format_article(result["url"], result["date"], result["category"], result["subcategory"], result["content"])
+
+
+def save_article(result, output_dir=OUTPUT_DIR):
+    """Synchronous save (atomic write) of an extracted article; returns its path."""
+    filepath = article_path(result, output_dir)
+    filepath.parent.mkdir(parents=True, exist_ok=True)
+    write_atomic(filepath, render_article(result))
+    return filepath
+
+
+class ExtractionPipeline:
+    """fetchers -> bounded queue -> process-pool extraction -> single writer -> ArticleWriter threads.
+
+    `submit` blocks while the raw queue is full, so the browser can never run
+    ahead of the extractors by more than `queue_size` pages. Files are written
+    asynchronously; an article is journaled in the index only once its file
+    is in place.
+    """
+
+    def __init__(self, index, processed_urls, workers=None, queue_size=16, fetcher=None, budget=MAX_PAGES_PER_SITE, writer=None, frontier=None):
+        self.index = index
+        self.frontier = frontier  # Crawl frontier: outcomes are checkpointed there too
+        self.writer = writer or ArticleWriter()
+        self.budget = budget  # Saved articles per site (None: unlimited, e.g. re-extraction from cache)
+        self.fetcher = fetcher  # FetchTier: lets thin HTTP pages be re-fetched with the browser
+        self.processed_urls = processed_urls
+        self.workers = workers or os.cpu_count() or 1
+        self.executor = ProcessPoolExecutor(max_workers=self.workers)
+        self.raw_queue = asyncio.Queue(maxsize=queue_size)
+        self.result_queue = asyncio.Queue(maxsize=queue_size)
+        self.saved = Counter()  # site -> saved articles
+        self._claimed = set()
+        self._tasks = []
+        self._refetches = set()
+        self._date_hints = {}
+        self._in_flight = Counter()  # site -> pages submitted but not yet journaled
+        self._idle = {}  # site -> event set when its last in-flight page is done
+        self._writing = {}  # url -> simhash of articles queued in the writer, not yet in the index
+        self._dropped = set()  # Sites whose queued pages are discarded (worker mode: lease lost)
+
+    def start(self):
+        self._tasks = [asyncio.create_task(self._extractor()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._writer()))
+        logger.info(f"⚙️ Extraction pipeline ready ({self.workers} processes)")
+
+    def has_budget(self, site):
+        return self.budget is None or self.saved[site] < self.budget
+
+    def claim(self, url):
+        """Returns False if the URL (or a variant of it) was already handled or is in flight in this run."""
+        canonical = canonicalize_url(url)
+        if url in self.processed_urls or canonical in self.processed_urls or canonical in self._claimed:
+            return False
+        self._claimed.add(canonical)
+        return True
+
+    def hint_date(self, url, date_iso):
+        if date_iso: self._date_hints[url] = date_iso
+
+    async def submit(self, site, url, html_content, via="browser"):
+        self._begin(site)
+        await self.raw_queue.put((site, url, html_content, via))
+
+    def _begin(self, site):
+        self._in_flight[site] += 1
+
+    def _end(self, site):
+        self._in_flight[site] -= 1
+        if not self._in_flight[site] and site in self._idle:
+            self._idle.pop(site).set()
+
+    def drop(self, sites):
+        """Discards the pages of these sites still waiting for extraction or writing (files already queued finish)."""
+        self._dropped.update(sites)
+
+    def resume(self, sites):
+        self._dropped.difference_update(sites)
+
+    async def drain(self, site):
+        """Waits until every page submitted for `site` is extracted, written and journaled (other sites keep flowing)."""
+        while self._in_flight[site]:
+            self._idle[site] = event = asyncio.Event()
+            await event.wait()
+
+    def _escalate(self, site, url):
+        """Short extraction from plain HTTP: probably JS-rendered, retry through the browser."""
+        self.fetcher.note_escalation(url, "short_extract")
+        self._begin(site)
+        task = asyncio.create_task(self._refetch_with_browser(site, url))
+        self._refetches.add(task)
+        task.add_done_callback(self._refetches.discard)
+
+    async def _refetch_with_browser(self, site, url):
+        try:
+            html_content, via = await self.fetcher.fetch_browser(url)
+            if site not in self._dropped:
+                await self.submit(site, url, html_content, via)
+        except Exception as e:
+            logger.error(f"Failed to process {url}: {e}")
+        finally:
+            self._end(site)
+
+    def _mark_processed(self, url, status, filepath=None, result=None):
+        if result and status == "saved":
+            self.index.record(url, status, filepath, result["date"],
+                              f"{result['category']}/{result['subcategory']}", result["content"])
+        elif self.index.path_for(url):
+            # --refresh / --reextract: a rejected re-extraction must not orphan the article already on disk
+            logger.info(f"📌 Kept the saved copy ({status} on re-extraction): {url}")
+        else:
+            self.index.record(url, status)
+        if self.frontier:
+            self.frontier.done(url, status)
+        metrics.count("outcome", status)
+        self.processed_urls.add(url)
+        self.processed_urls.add(canonicalize_url(url))
+
+    async def _extractor(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            site, url, html_content, via = await self.raw_queue.get()
+            if site in self._dropped:
+                self._end(site)
+                self.raw_queue.task_done()
+                continue
+            try:
+                with metrics.span("extract_worker", url):  # Includes waiting for a free process
+                    result = await loop.run_in_executor(self.executor, extract_page, url, html_content, self._date_hints.get(url))
+                metrics.observe_timings(result["timings"], url)
+            except Exception as e:
+                result = {"url": url, "status": "error", "error": str(e)}
+            result["via"] = via
+            await self.result_queue.put((site, result))
+            self.raw_queue.task_done()
+
+    async def _writer(self):
+        while True:
+            site, result = await self.result_queue.get()
+            try:
+                await self._write(site, result)
+            except Exception as e:
+                logger.error(f"Failed to save {result['url']}: {e}")
+            finally:
+                self._end(site)
+                self.result_queue.task_done()
+
+    async def _write(self, site, result):
+        url, status = result["url"], result["status"]
+        if site in self._dropped:
+            return  # Left unjournaled: the worker now holding the site crawls it
+        if status == "error":
+            # Not marked as processed: it will be retried on the next run
+            logger.error(f"Failed to process {url}: {result['error']}")
+            metrics.count("outcome", "error")
+            return
+        # An unchanged page ("cache") may still be the HTTP shell of a JS-rendered one: escalate it too
+        if self.fetcher and (result["via"] == "http" or (result["via"] == "cache" and self.fetcher.cached_tier(url) != "browser")):
+            if status == "too_short":
+                self._escalate(site, url)
+                return
+            self.fetcher.note_http_ok(url)
+        if status == "ok":
+            if not self.has_budget(site):
+                return  # Over budget (in-flight overshoot): left for the next run
+            # Only new articles are checked: an already-saved one is the earlier copy, never the duplicate
+            if NEAR_DUPLICATE_CHECK and result["simhash"] is not None and not self.index.path_for(url):
+                duplicate = find_near_duplicate(self.index, url, result["simhash"]) or self._writing_duplicate(url, result["simhash"])
+                if duplicate:
+                    logger.info(f"🧬 Skipped (Near-duplicate of {duplicate[0]}, {duplicate[1]} bits): {url}")
+                    self._mark_processed(url, "duplicate")
+                    return
+            self.saved[site] += 1
+            if result["simhash"] is not None:
+                self._writing[url] = result["simhash"]  # Until _saved remembers it (or the write fails)
+            # Waits only when the file stage is saturated; journaling happens in _saved once the file is written
+            try:
+                task = await self.writer.write(article_path(result), render_article(result),
+                                               partial(self._saved, result), self.index.path_for(url))
+            except BaseException:
+                self._writing.pop(url, None)
+                raise
+            self._begin(site)  # Still in flight until the file is written and journaled
+            task.add_done_callback(lambda _: self._written(site, url))
+            return
+        if status == "too_old":
+            logger.info(f"🕰️ Skipped (Too old: {result['year']}): {url}")
+        elif status == "title_noise":
+            logger.info(f"🗑️ Skipped (Title Noise): {result['title']}")
+        self._mark_processed(url, status)
+
+    def _writing_duplicate(self, url, value):
+        """Near-duplicate among the articles still queued in the writer (syndicated copies in one run)."""
+        for other_url, other in self._writing.items():
+            distance = hamming(value, other)
+            if other_url != url and distance <= SIMHASH_MAX_DISTANCE:
+                return other_url, distance
+        return None
+
+    def _written(self, site, url):
+        self._writing.pop(url, None)
+        self._end(site)
+
+    def _saved(self, result, filepath):
+        url = result["url"]
+        logger.info(f"✅ Saved [{result['category']}/{result['subcategory']}]: {filepath.name} ({format_timings(result['timings'])})")
+        self._mark_processed(url, "saved", filepath, result)
+        if result["simhash"] is not None:
+            remember(self.index, url, result["simhash"])
+
+    async def flush(self):
+        """Waits until everything submitted so far is extracted, written and committed to the index."""
+        await self.raw_queue.join()
+        await self.result_queue.join()
+        while self._refetches:
+            await asyncio.gather(*list(self._refetches), return_exceptions=True)
+            await self.raw_queue.join()
+            await self.result_queue.join()
+        await self.writer.flush()
+        self.index.commit()
+
+    async def close(self):
+        """Flushes, then stops the stages, the process pool and the file writer."""
+        await self.flush()
+        await self.writer.close()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self.executor.shutdown()
+        self.index.commit()
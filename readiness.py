@@ -0,0 +1,113 @@
+import asyncio
+import time
+from collections import defaultdict
+
+from config import READY_TIMEOUTS, READY_QUIET_MS
+from utils import setup_logging, get_domain
+
+logger = setup_logging("readiness")
+
+# Resolves once the DOM has had no mutation for `quiet` ms (or after `timeout` ms).
+DOM_QUIET_JS = """
+([quiet, timeout]) => new Promise(resolve => {
+    const start = performance.now();
+    let timer, cap;
+    const done = () => { observer.disconnect(); clearTimeout(timer); clearTimeout(cap); resolve(performance.now() - start); };
+    const observer = new MutationObserver(() => { clearTimeout(timer); timer = setTimeout(done, quiet); });
+    observer.observe(document.documentElement, {childList: true, subtree: true, characterData: true});
+    timer = setTimeout(done, quiet);
+    cap = setTimeout(done, timeout);
+})
+"""
+
+# Scrolls to the bottom, then resolves with the link count as soon as it grows past `before`
+# (or unchanged after `timeout` ms: infinite scroll is exhausted).
+SCROLL_AND_WAIT_LINKS_JS = """
+([before, timeout]) => new Promise(resolve => {
+    const count = () => document.getElementsByTagName('a').length;
+    let cap;
+    const observer = new MutationObserver(() => {
+        if (count() > before) { observer.disconnect(); clearTimeout(cap); resolve(count()); }
+    });
+    observer.observe(document.body, {childList: true, subtree: true});
+    cap = setTimeout(() => { observer.disconnect(); resolve(count()); }, timeout);
+    window.scrollTo(0, document.body.scrollHeight);
+})
+"""
+
+
+class ReadinessEngine:
+    """Event-driven replacement for the fixed sleeps after goto and between scrolls.
+
+    Each wait returns as soon as the page signals readiness (network idle or a
+    quiet DOM, new links after a scroll). Timeouts are learned per domain from
+    an EWMA of observed ready times, bounded by READY_TIMEOUTS, and persisted
+    in the URL index between runs. `stats` compares the time actually waited
+    with what the old fixed sleeps would have cost.
+    """
+
+    def __init__(self, profiles=None):
+        self.profiles = profiles or {}  # (domain, kind) -> [ewma_ms, samples]
+        self.stats = defaultdict(lambda: {"waited": 0.0, "baseline": 0.0})
+
+    def timeout_ms(self, domain, kind):
+        low, default, high = READY_TIMEOUTS[kind]
+        profile = self.profiles.get((domain, kind))
+        if not profile:
+            return default
+        return int(min(high, max(low, profile[0] * 3)))
+
+    def _learn(self, domain, kind, elapsed_ms):
+        profile = self.profiles.setdefault((domain, kind), [elapsed_ms, 0])
+        profile[0] = 0.7 * profile[0] + 0.3 * elapsed_ms if profile[1] else elapsed_ms
+        profile[1] += 1
+
+    def _account(self, domain, waited, baseline):
+        self.stats[domain]["waited"] += waited
+        self.stats[domain]["baseline"] += baseline
+
+    async def wait_ready(self, page, url, baseline=3.0):
+        """After goto(domcontentloaded): returns when the network is idle or the DOM stops changing."""
+        domain = get_domain(url)
+        timeout = self.timeout_ms(domain, "load")
+        start = time.perf_counter()
+        waiters = [
+            asyncio.ensure_future(page.wait_for_load_state("networkidle", timeout=timeout)),
+            asyncio.ensure_future(page.evaluate(DOM_QUIET_JS, [READY_QUIET_MS, timeout])),
+        ]
+        await asyncio.wait(waiters, timeout=timeout / 1000 + 1, return_when=asyncio.FIRST_COMPLETED)
+        for task in waiters:
+            task.cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
+        elapsed = time.perf_counter() - start
+        # A timeout is not a "ready" sample: do not let it inflate the profile
+        if elapsed * 1000 < timeout * 0.95:
+            self._learn(domain, "load", elapsed * 1000)
+        self._account(domain, elapsed, baseline)
+        return elapsed
+
+    async def scroll_until_exhausted(self, page, url, max_scrolls=10, baseline_per_scroll=1.5):
+        """Scrolls while new links keep appearing. Returns the number of scrolls that loaded content."""
+        domain = get_domain(url)
+        links = await page.evaluate("document.getElementsByTagName('a').length")
+        loaded = 0
+        for _ in range(max_scrolls):
+            timeout = self.timeout_ms(domain, "scroll")
+            start = time.perf_counter()
+            count = await page.evaluate(SCROLL_AND_WAIT_LINKS_JS, [links, timeout])
+            elapsed = time.perf_counter() - start
+            self._account(domain, elapsed, baseline_per_scroll)
+            if count <= links:
+                break  # Nothing new within the learned timeout: infinite scroll has stopped
+            self._learn(domain, "scroll", elapsed * 1000)
+            links = count
+            loaded += 1
+        return loaded
+
+    def log_savings(self, url):
+        stats = self.stats[get_domain(url)]
+        saved = stats["baseline"] - stats["waited"]
+        logger.info(f"⏱️ {get_domain(url)}: waited {stats['waited']:.1f}s instead of {stats['baseline']:.1f}s (saved {saved:.1f}s)")
+
+    def total_saved(self):
+        return sum(s["baseline"] - s["waited"] for s in self.stats.values())
@@ -0,0 +1,158 @@
+import argparse
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from config import OUTPUT_DIR, CATEGORIES, CLASSIFY_WORD_BOUNDARY
+from utils import setup_logging, classify_content, format_article, parse_article
+from url_index import UrlIndex, read_url_header
+
+logger = setup_logging("reclassify")
+
+
+def rules_hash(word_boundary):
+    """Changes whenever CATEGORIES (or the matching mode) changes: every file is then re-checked."""
+    rules = json.dumps([CATEGORIES, word_boundary], sort_keys=True)
+    return hashlib.sha1(rules.encode("utf-8")).hexdigest()
+
+
+def iter_articles(output_dir):
+    """Streams (path, size, mtime) of every Markdown file under output_dir."""
+    stack = [str(output_dir)]
+    while stack:
+        with os.scandir(stack.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir():
+                    stack.append(entry.path)
+                elif entry.name.endswith(".md"):
+                    stat = entry.stat()
+                    yield entry.path, stat.st_size, stat.st_mtime
+
+
+def classify_file(path, word_boundary):
+    """Worker process: reads one article and returns where it should live now."""
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        header, body = parse_article(f.read())
+    if not header.get("URL"):
+        return {"path": path, "skip": "no SOURCE INFO header"}
+    category, subcategory = classify_content(body, word_boundary)
+    date_iso = header.get("DATE")
+    date_iso = None if not date_iso or date_iso == "Unknown" else date_iso
+    return {
+        "path": path, "url": header["URL"], "date": date_iso,
+        "old_category": header.get("CATEGORY"), "category": category, "subcategory": subcategory,
+    }
+
+
+def target_path(output_dir, result):
+    year = result["date"].split("-")[0] if result["date"] else "Undated"
+    return os.path.join(str(output_dir), result["category"], result["subcategory"], year, os.path.basename(result["path"]))
+
+
+def build_plan(index, output_dir, word_boundary, workers=None):
+    """Classifies only new/modified files (or all of them when the rules changed) and returns the needed moves."""
+    rules = rules_hash(word_boundary)
+    known = index.reclassify_state()
+    scanned, todo = 0, []
+    for path, size, mtime in iter_articles(output_dir):
+        scanned += 1
+        state = known.get(path)
+        if state and state == (size, mtime, rules):
+            continue
+        todo.append((path, size, mtime))
+    logger.info(f"🔍 {scanned} files scanned, {len(todo)} to (re)classify")
+
+    plan = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        paths = [p for p, _, _ in todo]
+        results = executor.map(classify_file, paths, [word_boundary] * len(paths), chunksize=64)
+        for (path, size, mtime), result in zip(todo, results):
+            if "skip" in result:
+                index.save_reclassify_state(path, size, mtime, rules)
+                continue
+            new_category = f"{result['category']}/{result['subcategory']}"
+            destination = target_path(output_dir, result)
+            if destination == path and result["old_category"] == new_category:
+                index.save_reclassify_state(path, size, mtime, rules)
+                continue
+            plan.append({
+                "url": result["url"], "from": path, "to": destination,
+                "old_category": result["old_category"], "category": new_category,
+                "date": result["date"],
+            })
+    index.commit()
+    return plan, rules
+
+
+def apply_move(move):
+    """Writes the rewritten article next to its destination, renames it into place, then drops the source.
+
+    Interrupted at any point, the corpus holds either the old file or the new
+    one (the temp file is never a .md), and a re-run finishes the job.
+    """
+    with open(move["from"], "r", encoding="utf-8", errors="ignore") as f:
+        _, body = parse_article(f.read())
+    category, subcategory = move["category"].split("/", 1)
+    content = format_article(move["url"], move["date"], category, subcategory, body)
+    os.makedirs(os.path.dirname(move["to"]), exist_ok=True)
+    tmp = move["to"] + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(content)
+    os.replace(tmp, move["to"])
+    if move["from"] != move["to"]:
+        finish_move(move)
+
+
+def finish_move(move):
+    """Second half of apply_move: the rewritten copy is in place, only the source is left to drop."""
+    os.remove(move["from"])
+    try:
+        os.removedirs(os.path.dirname(move["from"]))  # Prunes folders left empty
+    except OSError:
+        pass
+
+
+def reclassify(output_dir=OUTPUT_DIR, word_boundary=CLASSIFY_WORD_BOUNDARY, dry_run=False, plan_file=None, workers=None):
+    if not output_dir.exists():
+        logger.error(f"❌ Dossier introuvable : {output_dir}")
+        return []
+    index = UrlIndex()
+    plan, rules = build_plan(index, output_dir, word_boundary, workers)
+    logger.info(f"📋 {len(plan)} files to move or rewrite")
+
+    if plan_file:
+        with open(plan_file, "w", encoding="utf-8") as f:
+            json.dump(plan, f, indent=2, ensure_ascii=False)
+        logger.info(f"📝 Plan written to {plan_file}")
+
+    if not dry_run:
+        for move in plan:
+            try:
+                if move["from"] != move["to"] and os.path.exists(move["to"]):
+                    if read_url_header(move["to"]) != move["url"]:
+                        logger.warning(f"⚠️ Target exists, skipped: {move['to']}")
+                        continue
+                    finish_move(move)  # Interrupted after the rename: the target is already this article
+                else:
+                    apply_move(move)
+            except OSError as e:
+                logger.error(f"Failed to move {move['from']}: {e}")
+                continue
+            stat = os.stat(move["to"])
+            index.move_document(move["url"], move["from"], move["to"], move["category"])
+            index.save_reclassify_state(move["to"], stat.st_size, stat.st_mtime, rules)
+            logger.info(f"📦 {move['old_category']} -> {move['category']}: {os.path.basename(move['to'])}")
+    index.close()
+    return plan
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Re-sort the existing corpus after a change of CATEGORIES.")
+    parser.add_argument("--dry-run", action="store_true", help="Compute the plan without touching any file")
+    parser.add_argument("--plan", help="Write the move plan to this JSON file")
+    parser.add_argument("--workers", type=int, default=None, help="Classification processes (default: one per core)")
+    parser.add_argument("--word-boundary", action="store_true", default=CLASSIFY_WORD_BOUNDARY,
+                        help="Only count whole-word keyword hits")
+    args = parser.parse_args()
+    reclassify(dry_run=args.dry_run, plan_file=args.plan, workers=args.workers, word_boundary=args.word_boundary)
@@ -0,0 +1,125 @@
+import re
+from collections import Counter
+
+from config import BLOCKED_RESOURCE_TYPES, BLOCKED_HOSTS, RESOURCE_OVERRIDES
+from utils import setup_logging, get_domain
+from metrics import metrics
+
+logger = setup_logging("resource_policy")
+
+# Resource types are matched by URL extension: the pattern runs in the driver,
+# where route.request.resource_type is not available without a Python callback
+EXTENSIONS = {
+    "image": ["png", "jpe?g", "gif", "webp", "avif", "svg", "ico", "bmp"],
+    "media": ["mp4", "webm", "mp3", "m4a", "ogg", "wav", "mov", "m3u8"],
+    "font": ["woff2?", "ttf", "otf", "eot"],
+    "stylesheet": ["css"],
+}
+
+# Resource Timing keeps 250 entries by default: raised so every allowed request is counted
+TIMING_BUFFER_SCRIPT = "performance.setResourceTimingBufferSize(10000)"
+
+# Bytes transferred for the current document and the subresources that were let through.
+# Cross-origin responses without Timing-Allow-Origin report 0, so this is a lower bound.
+ALLOWED_TRAFFIC_JS = """
+() => {
+    const entries = performance.getEntriesByType('navigation').concat(performance.getEntriesByType('resource'));
+    return {requests: entries.length, bytes: entries.reduce((sum, e) => sum + (e.transferSize || e.encodedBodySize || 0), 0)};
+}
+"""
+
+
+# Patterns are sent to the Playwright driver as JavaScript regexes: keep them to the common syntax
+def type_pattern(types):
+    extensions = [ext for t in types for ext in EXTENSIONS[t]]
+    return re.compile(r"^[^?#]*\.(?:" + "|".join(extensions) + r")(?:[?#]|$)", re.IGNORECASE)
+
+
+def host_pattern(hosts):
+    """Any scheme, the host or one of its subdomains; entries may carry a path prefix (youtube.com/embed)."""
+    return re.compile(r"^[a-z][a-z0-9+.\-]*://(?:[^/?#]*\.)?(?:" + "|".join(re.escape(h) for h in hosts) + r")(?=[:/?#]|$)", re.IGNORECASE)
+
+
+class ResourcePolicy:
+    """Request blocking configured once per browser context.
+
+    Every block reason (a resource type or a BLOCKED_HOSTS category) is one
+    regex route, matched by the Playwright driver: allowed requests never
+    reach Python. Only blocked requests call back, to be counted and aborted,
+    or let through when RESOURCE_OVERRIDES allows that reason on the domain
+    of the page being crawled.
+    """
+
+    def __init__(self, types=BLOCKED_RESOURCE_TYPES, hosts=BLOCKED_HOSTS, overrides=RESOURCE_OVERRIDES):
+        self.routes = {t: type_pattern([t]) for t in types}
+        self.routes.update({category: host_pattern(h) for category, h in hosts.items() if h})
+        self.host_reasons = {category for category, h in hosts.items() if h} | {"site"}
+        self.allow = {}
+        self.site_blocks = {}
+        for domain, override in overrides.items():
+            domain = get_domain(f"//{domain}")
+            self.allow[domain] = set(override.get("allow", []))
+            if override.get("block"):
+                self.site_blocks[domain] = host_pattern(override["block"])
+        extra = sorted({h for override in overrides.values() for h in override.get("block", [])})
+        if extra:
+            self.routes["site"] = host_pattern(extra)  # Only enforced on the domains that listed them
+        self.blocked = Counter()
+        self.allowed_requests = 0
+        self.allowed_bytes = 0
+
+    async def install(self, context):
+        await context.add_init_script(TIMING_BUFFER_SCRIPT)
+        for reason, pattern in self.routes.items():
+            await context.route(pattern, self._handler(reason))
+        logger.info(f"🚫 Resource policy: {', '.join(self.routes)} blocked in the browser context")
+
+    def _handler(self, reason):
+        async def handle(route):
+            request = route.request
+            if reason in self.host_reasons and self._is_page_navigation(request):
+                await route.fallback()  # The crawled page itself (a vendor's own blog), never a third party
+                return
+            domain = self._page_domain(request)
+            if reason in self.allow.get(domain, ()) or (reason == "site" and not self._site_blocked(domain, request.url)):
+                await route.fallback()  # Another route may still block it
+                return
+            self.blocked[reason] += 1
+            metrics.count("blocked_requests", reason)
+            await route.abort()
+        return handle
+
+    def _page_domain(self, request):
+        if not self.allow:
+            return None
+        try:
+            return get_domain(request.frame.page.url)
+        except Exception:
+            return None  # Service worker requests have no frame
+
+    @staticmethod
+    def _is_page_navigation(request):
+        try:
+            return request.is_navigation_request() and request.frame.parent_frame is None
+        except Exception:
+            return False  # Service worker requests have no frame
+
+    def _site_blocked(self, domain, url):
+        pattern = self.site_blocks.get(domain)
+        return bool(pattern and pattern.search(url))
+
+    async def measure(self, page):
+        """Adds the traffic the page let through since its last navigation (one evaluate per page use)."""
+        try:
+            traffic = await page.evaluate(ALLOWED_TRAFFIC_JS)
+        except Exception:
+            return
+        self.allowed_requests += traffic["requests"]
+        self.allowed_bytes += traffic["bytes"]
+        metrics.count("allowed_requests", n=traffic["requests"])
+        metrics.count("allowed_bytes", n=traffic["bytes"])
+
+    def summary(self):
+        blocked = ", ".join(f"{reason} {n}" for reason, n in self.blocked.most_common())
+        return (f"🚫 Blocked {sum(self.blocked.values())} requests ({blocked or 'none'}); "
+                f"let through {self.allowed_requests} requests, {self.allowed_bytes / 1e6:.1f} MB")
@@ -0,0 +1,80 @@
+import asyncio
+import random
+import time
+from contextlib import asynccontextmanager
+
+from utils import setup_logging, get_domain
+from metrics import metrics
+
+logger = setup_logging("scheduler")
+
+STEALTH_INIT_SCRIPT = "Object.defineProperty(navigator, 'webdriver', {get: () => undefined})"
+
+
+class PagePool:
+    """Fixed-size pool of Playwright pages shared by every site crawler.
+
+    Request blocking lives on the context (ResourcePolicy); with a policy,
+    the traffic a page let through is measured when it returns to the pool.
+    """
+
+    def __init__(self, context, size, policy=None):
+        self.context = context
+        self.size = max(1, size)
+        self.policy = policy
+        self._idle = asyncio.Queue()
+
+    async def _new_page(self):
+        page = await self.context.new_page()
+        await page.add_init_script(STEALTH_INIT_SCRIPT)
+        return page
+
+    async def start(self):
+        for _ in range(self.size):
+            self._idle.put_nowait(await self._new_page())
+        logger.info(f"🧵 Page pool ready ({self.size} pages)")
+
+    @asynccontextmanager
+    async def acquire(self):
+        with metrics.span("page_wait"):  # Time spent waiting for a free page: pool too small?
+            page = await self._idle.get()
+        if page.is_closed():
+            # A crashed renderer should not shrink the pool
+            page = await self._new_page()
+        try:
+            yield page
+        finally:
+            if self.policy and not page.is_closed():
+                await self.policy.measure(page)
+            self._idle.put_nowait(page)
+
+    async def close(self):
+        while not self._idle.empty():
+            page = self._idle.get_nowait()
+            if not page.is_closed():
+                await page.close()
+
+
+class DomainScheduler:
+    """Per-domain politeness: caps concurrent fetches and spaces out request starts."""
+
+    def __init__(self, max_per_domain=1, delay_range=(1.5, 3.0)):
+        self.max_per_domain = max(1, max_per_domain)
+        self.delay_range = delay_range
+        self._slots = {}
+        self._locks = {}
+        self._next_start = {}
+
+    @asynccontextmanager
+    async def slot(self, url):
+        domain = get_domain(url)
+        sem = self._slots.setdefault(domain, asyncio.Semaphore(self.max_per_domain))
+        start = time.perf_counter()
+        async with sem:
+            async with self._locks.setdefault(domain, asyncio.Lock()):
+                wait = self._next_start.get(domain, 0) - time.monotonic()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                self._next_start[domain] = time.monotonic() + random.uniform(*self.delay_range)
+            metrics.observe("politeness_wait", time.perf_counter() - start, url)
+            yield
@@ -0,0 +1,413 @@
+import hashlib
+import os
+import sqlite3
+import time
+from datetime import datetime, timezone
+
+from config import INDEX_DB
+from utils import setup_logging, load_processed_urls
+
+logger = setup_logging("url_index")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    url TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    path TEXT,
+    date TEXT,
+    category TEXT,
+    content_hash TEXT,
+    fetched_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_documents_path ON documents(path);
+CREATE TABLE IF NOT EXISTS dirs (
+    path TEXT PRIMARY KEY,
+    parent TEXT,
+    mtime REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_dirs_parent ON dirs(parent);
+CREATE TABLE IF NOT EXISTS domains (
+    domain TEXT PRIMARY KEY,
+    http_ok INTEGER NOT NULL DEFAULT 0,
+    escalated INTEGER NOT NULL DEFAULT 0,
+    needs_browser INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS readiness (
+    domain TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    ewma_ms REAL NOT NULL,
+    samples INTEGER NOT NULL,
+    PRIMARY KEY (domain, kind)
+);
+CREATE TABLE IF NOT EXISTS html_cache (
+    url TEXT PRIMARY KEY,
+    hash TEXT NOT NULL,
+    blob TEXT NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    fetched_at TEXT,
+    via TEXT
+);
+CREATE TABLE IF NOT EXISTS reclassify_state (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    rules_hash TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS fingerprints (
+    url TEXT PRIMARY KEY,
+    simhash INTEGER NOT NULL,
+    b0 INTEGER NOT NULL,
+    b1 INTEGER NOT NULL,
+    b2 INTEGER NOT NULL,
+    b3 INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_fingerprints_b0 ON fingerprints(b0);
+CREATE INDEX IF NOT EXISTS idx_fingerprints_b1 ON fingerprints(b1);
+CREATE INDEX IF NOT EXISTS idx_fingerprints_b2 ON fingerprints(b2);
+CREATE INDEX IF NOT EXISTS idx_fingerprints_b3 ON fingerprints(b3);
+CREATE TABLE IF NOT EXISTS frontier (
+    url TEXT PRIMARY KEY,
+    site TEXT NOT NULL,
+    run TEXT NOT NULL,
+    priority REAL NOT NULL,
+    position INTEGER NOT NULL,
+    date TEXT,
+    published INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL DEFAULT 'pending'
+);
+CREATE INDEX IF NOT EXISTS idx_frontier_site ON frontier(site, status, priority);
+CREATE TABLE IF NOT EXISTS frontier_sites (
+    site TEXT PRIMARY KEY,
+    run TEXT NOT NULL,
+    discovered_at TEXT,
+    finished_at TEXT
+);
+CREATE TABLE IF NOT EXISTS crawl_state (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def now_iso():
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+def content_hash(text):
+    return hashlib.sha1(text.encode("utf-8")).hexdigest() if text else None
+
+
+def read_url_header(file_path):
+    """Returns the URL: line of a saved article (first 10 lines), or None."""
+    try:
+        with open(file_path, "r", encoding="utf-8", errors="ignore") as f:
+            for _ in range(10):
+                line = f.readline()
+                if line.startswith("URL:"):
+                    return line.split("URL:", 1)[1].strip()
+    except OSError:
+        pass
+    return None
+
+
+class UrlIndex:
+    """On-disk URL/document index (SQLite) replacing processed_urls.log and the startup Drive rescan.
+
+    Writes are grouped: `record` only commits every `commit_every` rows (and on `close`).
+    Shared by several worker processes, it is opened with commit_every=1 so no
+    process holds the write lock between two writes.
+    """
+
+    def __init__(self, db_path=INDEX_DB, commit_every=50, commit_interval=5.0, timeout=5.0):
+        self.conn = sqlite3.connect(str(db_path), timeout=timeout)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        if "via" not in {row[1] for row in self.conn.execute("PRAGMA table_info(html_cache)")}:
+            self.conn.execute("ALTER TABLE html_cache ADD COLUMN via TEXT")  # Index created before the column
+        self.commit_every = commit_every
+        self.commit_interval = commit_interval
+        self._pending = 0
+        self._last_commit = time.monotonic()
+
+    def __contains__(self, url):
+        return self.conn.execute("SELECT 1 FROM documents WHERE url = ?", (url,)).fetchone() is not None
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+
+    def known_urls(self):
+        return {row[0] for row in self.conn.execute("SELECT url FROM documents")}
+
+    def record(self, url, status, path=None, date=None, category=None, content=None, fetched_at=None):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO documents (url, status, path, date, category, content_hash, fetched_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (url, status, str(path) if path else None, date, category, content_hash(content), fetched_at or now_iso())
+        )
+        self._written()
+
+    def path_for(self, url):
+        row = self.conn.execute("SELECT path FROM documents WHERE url = ?", (url,)).fetchone()
+        return row[0] if row else None
+
+    def _written(self):
+        """Batched commits: every `commit_every` writes, or `commit_interval` seconds, whichever comes first."""
+        self._pending += 1
+        if self._pending >= self.commit_every or time.monotonic() - self._last_commit >= self.commit_interval:
+            self.commit()
+
+    def commit(self):
+        self.conn.commit()
+        self._pending = 0
+        self._last_commit = time.monotonic()
+
+    def close(self):
+        self.commit()
+        self.conn.close()
+
+    # --- PER-DOMAIN FETCH LEARNING ---
+    def browser_only_domains(self):
+        return {row[0] for row in self.conn.execute("SELECT domain FROM domains WHERE needs_browser = 1")}
+
+    def update_domain_stats(self, stats, needs_browser):
+        """Accumulates this run's HTTP/escalation counters and persists the browser-only flags."""
+        for domain, counts in stats.items():
+            self.conn.execute(
+                "INSERT INTO domains (domain, http_ok, escalated) VALUES (?, ?, ?) "
+                "ON CONFLICT(domain) DO UPDATE SET http_ok = http_ok + excluded.http_ok, escalated = escalated + excluded.escalated",
+                (domain, counts["http_ok"], counts["escalated"])
+            )
+        self.conn.executemany(
+            "INSERT INTO domains (domain, needs_browser) VALUES (?, 1) "
+            "ON CONFLICT(domain) DO UPDATE SET needs_browser = 1",
+            ((d,) for d in needs_browser)
+        )
+        self.commit()
+
+    def readiness_profiles(self):
+        return {(d, k): [ewma, n] for d, k, ewma, n in self.conn.execute("SELECT domain, kind, ewma_ms, samples FROM readiness")}
+
+    def save_readiness_profiles(self, profiles):
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO readiness (domain, kind, ewma_ms, samples) VALUES (?, ?, ?, ?)",
+            ((d, k, ewma, n) for (d, k), (ewma, n) in profiles.items())
+        )
+        self.commit()
+
+    # --- RAW HTML CACHE (see html_cache.py) ---
+    def cache_entry(self, url):
+        row = self.conn.execute(
+            "SELECT hash, blob, etag, last_modified, fetched_at, via FROM html_cache WHERE url = ?", (url,)
+        ).fetchone()
+        return dict(zip(("hash", "blob", "etag", "last_modified", "fetched_at", "via"), row)) if row else None
+
+    def record_cache(self, url, digest, blob, etag, last_modified, fetched_at, via=None):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO html_cache (url, hash, blob, etag, last_modified, fetched_at, via) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (url, digest, blob, etag, last_modified, fetched_at, via)
+        )
+        self._written()
+
+    def touch_cache(self, url, fetched_at):
+        self.conn.execute("UPDATE html_cache SET fetched_at = ? WHERE url = ?", (fetched_at, url))
+        self._written()
+
+    def cached_urls(self):
+        """Cached URLs, except documents deliberately taken out of the corpus (deleted, quarantined, duplicates)."""
+        return [row[0] for row in self.conn.execute(
+            "SELECT c.url FROM html_cache c LEFT JOIN documents d ON d.url = c.url "
+            "WHERE d.status IS NULL OR d.status NOT IN ('deleted', 'quarantined', 'duplicate')"
+        )]
+
+    # --- CRAWL FRONTIER (see frontier.py) ---
+    def crawl_run(self):
+        row = self.conn.execute("SELECT value FROM crawl_state WHERE key = 'run'").fetchone()
+        return row[0] if row else None
+
+    def start_crawl_run(self, run):
+        """New run: frontier rows of older runs are dropped."""
+        self.conn.execute("INSERT OR REPLACE INTO crawl_state (key, value) VALUES ('run', ?)", (run,))
+        self.conn.execute("DELETE FROM frontier WHERE run != ?", (run,))
+        self.conn.execute("DELETE FROM frontier_sites WHERE run != ?", (run,))
+        self.commit()
+
+    def finish_crawl_run(self, run=None):
+        """Closes the current run, or only `run` if given (a worker must not close a newer one)."""
+        if run is None:
+            self.conn.execute("DELETE FROM crawl_state WHERE key = 'run'")
+        else:
+            self.conn.execute("DELETE FROM crawl_state WHERE key = 'run' AND value = ?", (run,))
+        self.commit()
+
+    def frontier_sites(self, run):
+        return {row[0]: (row[1], row[2]) for row in self.conn.execute(
+            "SELECT site, discovered_at, finished_at FROM frontier_sites WHERE run = ?", (run,)
+        )}
+
+    def add_frontier(self, site, run, rows):
+        """rows: (url, priority, position, date, published). Checkpointed immediately."""
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO frontier (url, site, run, priority, position, date, published) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [(url, site, run, priority, position, date, int(published)) for url, priority, position, date, published in rows]
+        )
+        self.conn.execute(
+            "INSERT OR REPLACE INTO frontier_sites (site, run, discovered_at, finished_at) VALUES (?, ?, ?, NULL)",
+            (site, run, now_iso())
+        )
+        self.commit()
+
+    def frontier_pending(self, site, run):
+        return self.conn.execute(
+            "SELECT url, date, published FROM frontier WHERE site = ? AND run = ? AND status = 'pending' "
+            "ORDER BY priority DESC, position", (site, run)
+        ).fetchall()
+
+    def frontier_done(self, url, status):
+        self.conn.execute("UPDATE frontier SET status = ? WHERE url = ?", (status, url))
+        self._written()
+
+    def frontier_saved(self, site, run):
+        return self.conn.execute(
+            "SELECT COUNT(*) FROM frontier WHERE site = ? AND run = ? AND status = 'saved'", (site, run)
+        ).fetchone()[0]
+
+    def finish_frontier_site(self, site, run):
+        self.conn.execute("UPDATE frontier_sites SET finished_at = ? WHERE site = ? AND run = ?", (now_iso(), site, run))
+        self.commit()
+
+    # --- OFFLINE RECLASSIFICATION (see reclassify.py) ---
+    def reclassify_state(self):
+        return {path: (size, mtime, rules) for path, size, mtime, rules in
+                self.conn.execute("SELECT path, size, mtime, rules_hash FROM reclassify_state")}
+
+    def save_reclassify_state(self, path, size, mtime, rules):
+        self.conn.execute("INSERT OR REPLACE INTO reclassify_state (path, size, mtime, rules_hash) VALUES (?, ?, ?, ?)",
+                          (path, size, mtime, rules))
+        self._written()
+
+    def move_document(self, url, old_path, new_path, category):
+        self.conn.execute("UPDATE documents SET path = ?, category = ? WHERE url = ?", (new_path, category, url))
+        if old_path != new_path:
+            self.conn.execute("DELETE FROM reclassify_state WHERE path = ?", (old_path,))
+        self._written()
+
+    def mark_removed(self, path, status):
+        """A saved file deleted or quarantined by clean_noise: the URL stays known, so it is not re-crawled."""
+        self.conn.execute("UPDATE documents SET status = ?, path = NULL WHERE path = ?", (status, str(path)))
+        self._written()
+
+    def document_paths(self):
+        """(path, url) of every saved article, as last reconciled (no directory walk)."""
+        return self.conn.execute("SELECT path, url FROM documents WHERE path IS NOT NULL").fetchall()
+
+    # --- NEAR-DUPLICATE FINGERPRINTS (see dedup.py) ---
+    def add_fingerprint(self, url, simhash, band_values):
+        self.conn.execute("INSERT OR REPLACE INTO fingerprints (url, simhash, b0, b1, b2, b3) VALUES (?, ?, ?, ?, ?, ?)",
+                          (url, simhash, *band_values))
+        self._written()
+
+    def fingerprint_candidates(self, band_values):
+        """Documents sharing at least one LSH band (indexed lookups, no full scan)."""
+        return self.conn.execute(
+            "SELECT url, simhash FROM fingerprints WHERE b0 = ? OR b1 = ? OR b2 = ? OR b3 = ?", band_values
+        ).fetchall()
+
+    def fingerprint_map(self):
+        return dict(self.conn.execute("SELECT url, simhash FROM fingerprints"))
+
+    def fingerprints(self):
+        return self.conn.execute(
+            "SELECT f.url, f.simhash, d.path FROM fingerprints f LEFT JOIN documents d ON d.url = f.url"
+        ).fetchall()
+
+    def unfingerprinted_paths(self):
+        return [row[0] for row in self.conn.execute(
+            "SELECT d.path FROM documents d LEFT JOIN fingerprints f ON f.url = d.url "
+            "WHERE d.path IS NOT NULL AND f.url IS NULL"
+        )]
+
+    # --- MIGRATION / RECONCILIATION ---
+    def import_log(self, log_file):
+        """One-shot import of the legacy processed_urls.log into an empty index."""
+        if len(self) or not log_file.exists():
+            return 0
+        urls = [u for u in load_processed_urls(log_file) if u]
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO documents (url, status, fetched_at) VALUES (?, 'legacy', ?)",
+            ((u, now_iso()) for u in urls)
+        )
+        self.commit()
+        logger.info(f"📥 Imported {len(urls)} URLs from {log_file.name}")
+        return len(urls)
+
+    def reconcile(self, output_dir):
+        """Syncs the index with files added/removed outside the crawler.
+
+        Driven by directory mtimes: an unchanged directory costs one stat() and is
+        walked through its known subdirectories; only changed directories are
+        listed, and only files unknown to the index get their header read.
+        """
+        if not output_dir.exists():
+            return 0
+        known_dirs = {path: (parent, mtime) for path, parent, mtime in self.conn.execute("SELECT path, parent, mtime FROM dirs")}
+        children = {}
+        for path, (parent, _) in known_dirs.items():
+            children.setdefault(parent, []).append(path)
+
+        added = scanned_dirs = 0
+        seen_dirs = set()
+        stack = [(str(output_dir), None)]
+        while stack:
+            dir_path, parent = stack.pop()
+            try:
+                mtime = os.stat(dir_path).st_mtime
+            except OSError:
+                continue
+            seen_dirs.add(dir_path)
+            known = known_dirs.get(dir_path)
+            if known and known[1] == mtime:
+                stack.extend((child, dir_path) for child in children.get(dir_path, []))
+                continue
+
+            scanned_dirs += 1
+            on_disk = set()
+            with os.scandir(dir_path) as entries:
+                for entry in entries:
+                    if entry.is_dir():
+                        stack.append((entry.path, dir_path))
+                    elif entry.name.endswith(".md"):
+                        on_disk.add(entry.path)
+
+            indexed = {row[0] for row in self.conn.execute(
+                "SELECT path FROM documents WHERE path LIKE ? ESCAPE '\\'", (self._like_prefix(dir_path),)
+            ) if os.path.dirname(row[0]) == dir_path}
+            for file_path in on_disk - indexed:
+                url = read_url_header(file_path)
+                if url:
+                    self.conn.execute(
+                        "INSERT INTO documents (url, status, path, fetched_at) VALUES (?, 'saved', ?, ?) "
+                        "ON CONFLICT(url) DO UPDATE SET status = 'saved', path = excluded.path",
+                        (url, file_path, now_iso())
+                    )
+                    added += 1
+            for file_path in indexed - on_disk:
+                # Deleted by hand or by clean_noise: keep the URL so it is not re-crawled
+                self.conn.execute("UPDATE documents SET status = 'deleted', path = NULL WHERE path = ?", (file_path,))
+            self.conn.execute("INSERT OR REPLACE INTO dirs (path, parent, mtime) VALUES (?, ?, ?)", (dir_path, parent, mtime))
+
+        for gone in set(known_dirs) - seen_dirs:
+            # Whole folder removed: its files are deleted too (never listed, so not caught above)
+            self.conn.execute(
+                "UPDATE documents SET status = 'deleted', path = NULL WHERE path LIKE ? ESCAPE '\\'", (self._like_prefix(gone),)
+            )
+            self.conn.execute("DELETE FROM dirs WHERE path = ?", (gone,))
+        self.commit()
+        logger.info(f"📂 Index reconciled: {scanned_dirs} changed folders, {added} new files ({len(self)} URLs known)")
+        return added
+
+    @staticmethod
+    def _like_prefix(dir_path):
+        escaped = dir_path.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        return escaped + os.sep.replace("\\", "\\\\") + "%"
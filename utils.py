@@ -1,8 +1,9 @@
 import re
 import logging
 from urllib.parse import urlparse
-from dateparser import parse
-from config import CATEGORIES, LOG_FILE
+from config import LOG_FILE, CLASSIFY_WORD_BOUNDARY
+from classifier import get_classifier
+from dates import normalize_date, date_from_url  # Re-exported: tiered date engine (dates.py)
 
 # --- LOGGING SETUP ---
 def setup_logging(name, log_file="crawler.log"):
@@ -43,41 +44,39 @@ def get_site_name(url):
     except:
         return "web"
 
+def get_domain(url):
+    """Normalized host used as the politeness key (www. stripped)."""
+    return urlparse(url).netloc.lower().replace("www.", "")
+
 def slugify(text):
     if not text: return "sans_titre"
     return re.sub(r'[^a-z0-9]+', '_', text.lower()).strip('_')
 
-def normalize_date(raw_date):
-    if not raw_date: return None
-    try:
-        parsed = parse(str(raw_date))
-        return parsed.strftime("%Y-%m-%d") if parsed else None
-    except: return None
+def classify_content(content, word_boundary=CLASSIFY_WORD_BOUNDARY):
+    """Best (category, subcategory) for a text; single pass via the compiled keyword automaton."""
+    return get_classifier(word_boundary).classify(content)
 
-def classify_content(content):
-    content_lower = content.lower()
-    scores = {}
-    for cat, subcats in CATEGORIES.items():
-        for subcat, keywords in subcats.items():
-            count = sum(content_lower.count(k) for k in keywords)
-            if count > 0: scores[(cat, subcat)] = count
-    
-    if not scores: return "Uncategorized", "Misc"
-    return max(scores, key=scores.get)
+def format_article(url, date_iso, category, subcategory, content):
+    """Saved Markdown layout: SOURCE INFO header, then the extracted body."""
+    return f"--- SOURCE INFO ---\nURL: {url}\nDATE: {date_iso or 'Unknown'}\nCATEGORY: {category}/{subcategory}\n---\n\n{content}"
 
-def load_processed_urls():
-    if LOG_FILE.exists():
-        with open(LOG_FILE, "r", encoding="utf-8") as f:
+def parse_article(text):
+    """Inverse of format_article: returns (header dict, body)."""
+    if not text.startswith("--- SOURCE INFO ---"):
+        return {}, text
+    head, sep, body = text.partition("\n---\n")
+    header = {}
+    for line in head.splitlines()[1:]:
+        key, colon, value = line.partition(":")
+        if colon: header[key.strip()] = value.strip()
+    return header, body[1:] if body.startswith("\n") else body
+
+def load_processed_urls(log_file=LOG_FILE):
+    if log_file.exists():
+        with open(log_file, "r", encoding="utf-8") as f:
             return set(line.strip() for line in f)
     return set()
 
-def save_processed_url(url):
-    try:
-        with open(LOG_FILE, "a", encoding="utf-8") as f:
-            f.write(url + "\n")
-    except Exception as e:
-        logger.error(f"Error saving URL {url}: {e}")
-
 def scan_existing_files(output_dir):
     existing = set()
     if not output_dir.exists(): return existing
@@ -0,0 +1,266 @@
+import argparse
+import hashlib
+import json
+import os
+import socket
+import sqlite3
+import time
+from contextlib import contextmanager
+
+from config import WORK_QUEUE_DB, WORKER_LEASE_SECONDS, WORKER_MAX_ATTEMPTS, SOURCE_WEIGHTS
+from utils import setup_logging, get_domain
+from url_index import now_iso
+
+logger = setup_logging("work_queue")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run TEXT PRIMARY KEY,
+    started_at TEXT NOT NULL,
+    finished_at TEXT
+);
+CREATE TABLE IF NOT EXISTS leases (
+    domain TEXT PRIMARY KEY,
+    run TEXT NOT NULL,
+    sites TEXT NOT NULL,
+    weight REAL NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    worker TEXT,
+    expires_at REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    saved INTEGER NOT NULL DEFAULT 0,
+    finished_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_leases_status ON leases(run, status);
+CREATE TABLE IF NOT EXISTS workers (
+    worker TEXT PRIMARY KEY,
+    run TEXT NOT NULL,
+    host TEXT,
+    pid INTEGER,
+    started_at TEXT,
+    heartbeat REAL,
+    saved INTEGER NOT NULL DEFAULT 0,
+    report TEXT,
+    finished_at TEXT
+);
+"""
+
+
+def default_worker_id():
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def rendezvous_owner(domain, workers):
+    """Highest-random-weight hashing: each domain maps to the same live worker, and only the
+    domains of a worker that leaves (or joins) move."""
+    return max(workers, key=lambda w: hashlib.blake2b(f"{w}\n{domain}".encode("utf-8"), digest_size=8).digest())
+
+
+def group_by_domain(sites, weights=SOURCE_WEIGHTS):
+    """{domain: ([sources], weight)}: sources on one host share a lease, so one worker stays polite to it."""
+    groups = {}
+    for site in sites:
+        members, weight = groups.get(get_domain(site), ([], 0.0))
+        groups[get_domain(site)] = (members + [site], max(weight, weights.get(site, 1.0)))
+    return groups
+
+
+class WorkQueue:
+    """Shared domain-lease queue for several crawler processes (worker mode).
+
+    One lease per domain: the worker holding it crawls every source of that
+    domain, so per-domain politeness holds across processes. Leases expire
+    unless renewed, so the domains of a crashed worker are picked up by the
+    others; free domains go first to the worker that rendezvous hashing
+    assigns them to, so with stable worker ids (--worker-id) a domain stays
+    with the same worker from run to run.
+
+    Every operation is a short transaction and the file uses a rollback
+    journal (not WAL, which needs shared memory on a single host): the queue
+    can sit on a mount shared by several hosts.
+    """
+
+    def __init__(self, db_path=WORK_QUEUE_DB, worker=None, lease_seconds=WORKER_LEASE_SECONDS, max_attempts=WORKER_MAX_ATTEMPTS):
+        self.conn = sqlite3.connect(str(db_path), timeout=60, isolation_level=None)
+        self.conn.executescript(SCHEMA)
+        self.worker = worker or default_worker_id()
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.run = self.active_run()
+
+    @contextmanager
+    def _transaction(self):
+        self.conn.execute("BEGIN IMMEDIATE")  # Takes the write lock up front: claims never interleave
+        try:
+            yield
+            self.conn.execute("COMMIT")
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+
+    def active_run(self):
+        row = self.conn.execute("SELECT run FROM runs WHERE finished_at IS NULL ORDER BY started_at DESC LIMIT 1").fetchone()
+        return row[0] if row else None
+
+    def seed(self, sites, weights=SOURCE_WEIGHTS):
+        """Joins the active run (adding sources appended to urls.txt since) or starts a new one; returns the run id."""
+        groups = group_by_domain(sites, weights)
+        with self._transaction():
+            self.run = self.active_run()
+            if not self.run:
+                self.run = now_iso()
+                self.conn.execute("INSERT INTO runs (run, started_at) VALUES (?, ?)", (self.run, now_iso()))
+                self.conn.execute("DELETE FROM leases")
+                self.conn.execute("DELETE FROM workers WHERE run != ?", (self.run,))
+                logger.info(f"🆕 Work queue run {self.run}: {len(groups)} domains")
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO leases (domain, run, sites, weight) VALUES (?, ?, ?, ?)",
+                [(domain, self.run, json.dumps(members), weight) for domain, (members, weight) in groups.items()]
+            )
+            self.conn.execute(
+                "INSERT OR REPLACE INTO workers (worker, run, host, pid, started_at, heartbeat) VALUES (?, ?, ?, ?, ?, ?)",
+                (self.worker, self.run, socket.gethostname(), os.getpid(), now_iso(), time.time())
+            )
+        return self.run
+
+    def live_workers(self, now):
+        return [row[0] for row in self.conn.execute(
+            "SELECT worker FROM workers WHERE run = ? AND finished_at IS NULL AND heartbeat >= ?", (self.run, now - self.lease_seconds)
+        )]
+
+    def claim(self):
+        """Leases the next free (or expired) domain; returns (domain, [sources]) or None."""
+        now = time.time()
+        with self._transaction():
+            live = set(self.live_workers(now)) | {self.worker}
+            rows = self.conn.execute(
+                "SELECT domain, sites, weight, status, worker, attempts FROM leases "
+                "WHERE run = ? AND (status = 'pending' OR (status = 'leased' AND expires_at < ?))", (self.run, now)
+            ).fetchall()
+            # Own domains first (rendezvous), then the heaviest; others' domains are taken too, so no worker idles
+            rows.sort(key=lambda r: (rendezvous_owner(r[0], live) != self.worker, -r[2], r[0]))
+            for domain, sites, _, status, previous, attempts in rows:
+                if attempts >= self.max_attempts:
+                    self.conn.execute("UPDATE leases SET status = 'failed', worker = NULL, finished_at = ? WHERE domain = ?", (now_iso(), domain))
+                    logger.error(f"❌ {domain}: {attempts} leases without finishing, marked failed for this run")
+                    continue
+                if status == "leased":
+                    logger.warning(f"♻️ Lease of {previous} on {domain} expired: taken over")
+                self.conn.execute(
+                    "UPDATE leases SET status = 'leased', worker = ?, expires_at = ?, attempts = attempts + 1 WHERE domain = ?",
+                    (self.worker, now + self.lease_seconds, domain)
+                )
+                return domain, json.loads(sites)
+        return None
+
+    def renew(self, domains):
+        """Extends this worker's leases; returns the domains it no longer holds (expired and taken over)."""
+        expires = time.time() + self.lease_seconds
+        lost = []
+        with self._transaction():
+            for domain in domains:
+                cursor = self.conn.execute(
+                    "UPDATE leases SET expires_at = ? WHERE domain = ? AND worker = ? AND status = 'leased'",
+                    (expires, domain, self.worker)
+                )
+                if not cursor.rowcount:
+                    lost.append(domain)
+        return lost
+
+    def complete(self, domain, saved):
+        self.conn.execute(
+            "UPDATE leases SET status = 'done', expires_at = NULL, saved = ?, finished_at = ? WHERE domain = ? AND worker = ?",
+            (saved, now_iso(), domain, self.worker)
+        )
+
+    def release(self, domain):
+        """Hands a lease back untouched (worker stopped on purpose): not counted as an attempt."""
+        self.conn.execute(
+            "UPDATE leases SET status = 'pending', worker = NULL, expires_at = NULL, attempts = attempts - 1 "
+            "WHERE domain = ? AND worker = ? AND status = 'leased'", (domain, self.worker)
+        )
+
+    def heartbeat(self, saved, report=None, finished=False):
+        """Publishes this worker's progress (articles saved, metrics report) for the aggregated view."""
+        self.conn.execute(
+            "UPDATE workers SET heartbeat = ?, saved = ?, report = COALESCE(?, report), finished_at = ? WHERE worker = ?",
+            (time.time(), saved, json.dumps(report) if report else None, now_iso() if finished else None, self.worker)
+        )
+
+    def is_complete(self):
+        return not self.conn.execute(
+            "SELECT COUNT(*) FROM leases WHERE run = ? AND status IN ('pending', 'leased')", (self.run,)
+        ).fetchone()[0]
+
+    def workers_final(self):
+        """True once no live worker of the run still has its final report to post (a lost one never will)."""
+        return not self.conn.execute(
+            "SELECT COUNT(*) FROM workers WHERE run = ? AND finished_at IS NULL AND heartbeat >= ?",
+            (self.run, time.time() - self.lease_seconds)
+        ).fetchone()[0]
+
+    def finish_run(self):
+        """Closes the run once every domain is done or failed and every worker has posted its final report.
+
+        True for the one worker that closes it; as each worker posts its own
+        report before calling this, the last one to finish always closes it.
+        """
+        if not self.is_complete() or not self.workers_final():
+            return False
+        cursor = self.conn.execute("UPDATE runs SET finished_at = ? WHERE run = ? AND finished_at IS NULL", (now_iso(), self.run))
+        return cursor.rowcount == 1
+
+    def reports(self):
+        return [json.loads(row[0]) for row in self.conn.execute("SELECT report FROM workers WHERE run = ? AND report IS NOT NULL", (self.run,))]
+
+    def progress(self):
+        """The whole run as one crawl: domains by status, articles saved, and each worker's share."""
+        now = time.time()
+        statuses = dict(self.conn.execute("SELECT status, COUNT(*) FROM leases WHERE run = ? GROUP BY status", (self.run,)).fetchall())
+        held = dict(self.conn.execute(
+            "SELECT worker, COUNT(*) FROM leases WHERE run = ? AND status = 'leased' GROUP BY worker", (self.run,)
+        ).fetchall())
+        workers = [
+            {"worker": worker, "host": host, "saved": saved, "leases": held.get(worker, 0),
+             "state": "finished" if finished else "alive" if now - heartbeat < self.lease_seconds else "lost",
+             "last_seen_s": round(now - heartbeat)}
+            for worker, host, saved, heartbeat, finished in self.conn.execute(
+                "SELECT worker, host, saved, heartbeat, finished_at FROM workers WHERE run = ? ORDER BY worker", (self.run,)
+            )
+        ]
+        return {
+            "run": self.run,
+            "domains": sum(statuses.values()),
+            "status": statuses,
+            "saved": sum(w["saved"] for w in workers),
+            "workers": workers,
+        }
+
+    def log_progress(self):
+        p = self.progress()
+        status = ", ".join(f"{n} {s}" for s, n in sorted(p["status"].items()))
+        alive = sum(1 for w in p["workers"] if w["state"] == "alive")
+        logger.info(f"📊 Run {p['run']}: {p['domains']} domains ({status}), {p['saved']} articles saved, {alive} live workers")
+
+    def close(self):
+        self.conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Aggregated progress of the worker-mode crawl (shared work queue).")
+    parser.add_argument("--json", action="store_true", help="Print the progress as JSON")
+    args = parser.parse_args()
+
+    queue = WorkQueue()
+    if not queue.run:
+        row = queue.conn.execute("SELECT run, finished_at FROM runs ORDER BY started_at DESC LIMIT 1").fetchone()
+        queue.run = row[0] if row else None
+    if not queue.run:
+        logger.info("No worker-mode run yet")
+    elif args.json:
+        print(json.dumps(queue.progress(), indent=2))
+    else:
+        queue.log_progress()
+        for w in queue.progress()["workers"]:
+            logger.info(f"   • {w['worker']} ({w['state']}, last seen {w['last_seen_s']}s ago): {w['saved']} saved, {w['leases']} leases held")
+    queue.close()
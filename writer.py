@@ -0,0 +1,94 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from config import WRITER_THREADS, WRITER_MAX_PENDING, WRITER_FSYNC
+from utils import setup_logging
+from metrics import metrics
+
+logger = setup_logging("writer")
+
+
+def write_atomic(path, content, fsync=WRITER_FSYNC):
+    """Writes next to the target, then renames over it: readers (and Drive sync) only ever see a complete file.
+
+    The temp name starts with a dot and does not end in .md, so an interrupted
+    write is never picked up as an article.
+    """
+    path = str(path)
+    directory, name = os.path.split(path)
+    tmp = os.path.join(directory, f".{name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(content)
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+
+class ArticleWriter:
+    """Asynchronous file stage between the pipeline and the (Drive-synced) output folder.
+
+    `write` only waits when WRITER_MAX_PENDING files are already in flight
+    (backpressure); the actual I/O runs on a small thread pool, so the event
+    loop never blocks on the mount. `on_done` runs back on the event loop
+    once the file is in place: callers journal the article there, so the
+    index never points to a file that does not exist yet.
+    """
+
+    def __init__(self, threads=WRITER_THREADS, max_pending=WRITER_MAX_PENDING, fsync=WRITER_FSYNC):
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="writer")
+        self.fsync = fsync
+        self.written = 0
+        self._slots = asyncio.Semaphore(max_pending)
+        self._pending = set()
+        self._dirs = set()  # Directories already created during this run
+
+    @property
+    def pending(self):
+        return len(self._pending)
+
+    async def write(self, path, content, on_done=None, replaces=None):
+        """Queues a file write and returns its task; `replaces` is a previous copy removed once the new one is in place."""
+        await self._slots.acquire()
+        task = asyncio.create_task(self._run(path, content, on_done, replaces))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+        return task
+
+    async def _run(self, path, content, on_done, replaces):
+        try:
+            await asyncio.get_running_loop().run_in_executor(self.executor, self._write_file, path, content, replaces)
+            self.written += 1
+            if on_done: on_done(path)
+        except Exception as e:
+            logger.error(f"Failed to write {path}: {e}")
+        finally:
+            self._slots.release()
+
+    def _write_file(self, path, content, replaces):
+        with metrics.span("write"):
+            directory = os.path.dirname(str(path))
+            if directory not in self._dirs:
+                os.makedirs(directory, exist_ok=True)
+                self._dirs.add(directory)
+            write_atomic(path, content, self.fsync)
+            if replaces and replaces != str(path) and os.path.exists(replaces):
+                os.remove(replaces)  # Re-extracted into another folder/name: drop the stale copy
+
+    async def flush(self):
+        """Waits until every queued file is written (and journaled)."""
+        while self._pending:
+            await asyncio.gather(*list(self._pending), return_exceptions=True)
+
+    async def close(self):
+        await self.flush()
+        self.executor.shutdown()